@@ -0,0 +1,764 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import sys
+import getopt
+import re
+import asyncio
+import logging
+import socket
+from textwrap import wrap
+from timeit import default_timer as timer
+import config
+import metrics
+import client
+import ircd
+import roster
+import inflight
+import cache
+import pipeline
+import groups
+import workers
+import eventloop
+import resolver
+import motd
+import timerwheel
+import ltd
+import scheduler
+
+def measure(fn, repeat=5):
+    best = None
+
+    for _ in range(repeat):
+        start = timer()
+
+        fn()
+
+        elapsed = timer() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+def report(name, count, unit, elapsed):
+    print("%-40s %12.0f %s/s (%.4fs)" % (name, count / elapsed, unit, elapsed))
+
+"""
+    LTD decoder:
+"""
+class LegacyLTDDecoder:
+    def __init__(self):
+        self.__buffer = bytearray()
+        self.__listeners = []
+
+    def add_listener(self, listener):
+        self.__listeners.append(listener)
+
+    def write(self, data):
+        self.__buffer.extend(data)
+        self.__process__()
+
+    def __process__(self):
+        length = len(self.__buffer)
+
+        if length >= 2 and length - 1 >= self.__buffer[0]:
+            p_length = self.__buffer[0]
+
+            for f in self.__listeners:
+                f(chr(self.__buffer[1]), self.__buffer[2:p_length + 1])
+
+            self.__buffer = self.__buffer[p_length + 1:]
+            self.__process__()
+
+def wl_frame():
+    e = ltd.Encoder("i")
+
+    e.add_field_str("wl")
+    e.add_field_str(" ")
+    e.add_field_str("nick")
+    e.add_field_str("42")
+    e.add_field_str("0")
+    e.add_field_str("1580000000")
+    e.add_field_str("loginid")
+    e.add_field_str("example.org", append_null=True)
+
+    return bytes(e.encode())
+
+def wl_burst(size):
+    frame = wl_frame()
+
+    return frame * (size // len(frame))
+
+def ltd_decoder():
+    for size, chunk_size, bursts in ((256, 256, 1000), (64 * 1024, 64 * 1024, 10), (64 * 1024, 1460, 10)):
+        data = wl_burst(size)
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)] * bursts
+        frames = data.count(b"wl") * bursts
+
+        for name, cls in (("legacy", LegacyLTDDecoder), ("current", ltd.Decoder)):
+            def run():
+                d = cls()
+
+                d.add_listener(lambda t, p: None)
+
+                for c in chunks:
+                    d.write(c)
+
+            try:
+                report("ltd.Decoder %s (%d/%d)" % (name, size, chunk_size), frames, "frames", measure(run))
+            except RecursionError:
+                print("ltd.Decoder %s (%d/%d): recursion limit exceeded" % (name, size, chunk_size))
+
+"""
+    LTD fields:
+"""
+def legacy_split(payload):
+    fields = []
+    field = []
+
+    for b in payload:
+        if b == 1:
+            fields.append(bytearray(field))
+            field = []
+        else:
+            field.append(b)
+
+    fields.append(bytearray(field))
+
+    return fields
+
+def ltd_fields():
+    e = ltd.Encoder("b")
+
+    e.add_field_str("nick")
+    e.add_field_str("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 3, append_null=True)
+
+    open_msg = bytes(e.encode()[2:])
+    wl_row = wl_frame()[2:]
+    count = 10000
+
+    for name, payload in (("b", open_msg), ("wl", wl_row)):
+        def run_legacy():
+            for _ in range(count):
+                fields = [f.decode("UTF-8").strip("\0") for f in legacy_split(payload)]
+                fields[0]
+
+        def run_current():
+            for _ in range(count):
+                fields = ltd.Fields(payload)
+                fields[0]
+
+        report("ltd fields legacy (%s)" % name, count, "packets", measure(run_legacy))
+        report("ltd fields current (%s)" % name, count, "packets", measure(run_current))
+
+"""
+    LTD encoder:
+"""
+class LegacyLTDEncoder:
+    def __init__(self, T):
+        self.__T = T
+        self.__d = bytearray()
+
+    def add_field(self, data):
+        if self.__d:
+            self.__d.append(1)
+
+        self.__d.extend(data)
+
+    def add_field_str(self, text, append_null=False):
+        self.add_field(text.encode("UTF-8", "backslashreplace"))
+
+        if append_null:
+            self.__d.append(0)
+
+    def encode(self):
+        pkg = bytearray()
+
+        if len(self.__d) >= 255:
+            raise OverflowError
+
+        pkg.append(len(self.__d) + 1)
+        pkg.append(ord(self.__T))
+        pkg.extend(self.__d)
+
+        return pkg
+
+def ltd_encoder():
+    count = 100000
+
+    def encode(cls, *args):
+        e = cls("h", *args)
+
+        e.add_field_str("m")
+        e.add_field_str("nick Lorem ipsum dolor sit amet, consectetur adipiscing elit.", append_null=True)
+
+        return e.encode()
+
+    def run_legacy():
+        for _ in range(count):
+            encode(LegacyLTDEncoder)
+
+    def run_current():
+        for _ in range(count):
+            encode(ltd.Encoder)
+
+    def run_batched():
+        buffer = bytearray()
+
+        for _ in range(count):
+            encode(ltd.Encoder, buffer)
+
+    def run_legacy_ping():
+        # the original Client.ping(): encode a packet & write it to the transport
+        transport = CountingTransport()
+
+        for _ in range(count):
+            e = LegacyLTDEncoder("l")
+
+            e.add_field_str("", append_null=True)
+
+            transport.write(e.encode())
+
+    def run_ping():
+        asyncio.run(send_pings(count))
+
+    report("ltd encoder legacy", count, "packets", measure(run_legacy))
+    report("ltd encoder current", count, "packets", measure(run_current))
+    report("ltd encoder batched", count, "packets", measure(run_batched))
+    report("ltd ping legacy (encode, write)", count, "packets", measure(run_legacy_ping))
+    report("ltd ping current (client, scheduler)", count, "packets", measure(run_ping))
+
+async def send_pings(count):
+    # Client.ping() -> scheduler -> transport, the bucket doesn't delay any packet
+    transport = CountingTransport()
+    icb_client = client.Client("localhost", 7326)
+
+    icb_client._Client__transport = transport
+    icb_client._Client__scheduler = scheduler.Scheduler(transport.write, count, count)
+
+    for _ in range(count):
+        icb_client.ping()
+
+    await asyncio.sleep(0)
+
+    assert transport.writes == count
+
+"""
+    message chunker:
+"""
+def legacy_chunks(receiver, message):
+    packets = []
+
+    for part in wrap(message, 200):
+        e = ltd.Encoder("h")
+
+        e.add_field_str("m")
+        e.add_field_str("%s %s" % (receiver, part), append_null=True)
+
+        packets.append(e.encode())
+
+    return packets
+
+def message_chunker():
+    text = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 200
+    size = len(text.encode("UTF-8"))
+    count = 100
+
+    def run_legacy():
+        for _ in range(count):
+            legacy_chunks("nick", text)
+
+    def run_current():
+        for _ in range(count):
+            ltd.encode_chunks_into(bytearray(), "h", b"m\x01nick ", text)
+
+    report("message chunker legacy", count * size, "bytes", measure(run_legacy))
+    report("message chunker current", count * size, "bytes", measure(run_current))
+
+"""
+    IRC session output:
+"""
+class CountingTransport(asyncio.Transport):
+    def __init__(self):
+        super().__init__()
+
+        self.writes = 0
+        self.bytes = bytearray()
+
+    def get_extra_info(self, name, default=None):
+        if name == "peername":
+            return ("127.0.0.1", 6667)
+
+        return default
+
+    def write(self, data):
+        self.writes += 1
+        self.bytes.extend(data)
+
+    def is_closing(self):
+        return False
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+def new_session(transport):
+    logger = logging.getLogger("benchmark")
+    logger.setLevel(logging.CRITICAL)
+
+    counters = metrics.Counters()
+    timers = timerwheel.TimerWheel()
+    shared = ircd.Shared(connections={},
+                         counters=counters,
+                         roster=roster.Roster(60.0),
+                         queries=inflight.Registry(counters, 30.0, timers),
+                         away_cache=cache.TTLCache(16, 60.0, counters, "away_cache"),
+                         groups=groups.Registry(counters),
+                         limit=workers.ConnectionLimit(100),
+                         resolver=resolver.Resolver(counters, 1.0, 16, 60.0, 60.0),
+                         welcome=motd.Template([":localhost 001 %s :Welcome" % motd.NICK]),
+                         motd=motd.MOTD("localhost", "motd", 60.0),
+                         timers=timers)
+
+    session = ircd.IRCServerProtocol(config.Config(), logger, shared)
+
+    session.connection_made(transport)
+
+    icb_client = client.Client("localhost", 7326)
+
+    session._IRCServerProtocol__client = icb_client
+
+    icb_client.state.nick = "benchmark"
+    icb_client.state.add_listener(session)
+
+    return session, icb_client.state
+
+async def join_group(members):
+    transport = CountingTransport()
+    session, state = new_session(transport)
+
+    state.group = "benchmark"
+    state.joining = True
+    state.group_status = "pvl"
+    state.moderator = "user0"
+    state.topic = "benchmark"
+
+    state.add_members(("user%d" % i, "user%d@example.org" % i) for i in range(members))
+
+    start = timer()
+
+    state.joining = False
+
+    await asyncio.sleep(0)
+
+    elapsed = timer() - start
+
+    session.connection_lost(None)
+
+    return transport, elapsed
+
+def irc_join():
+    members = 1000
+
+    transport, elapsed = asyncio.run(join_group(members))
+
+    print("%-40s %12d lines, %d writes, %d bytes (%.4fs)" % ("join %d members" % members,
+                                                             transport.bytes.count(b"\r\n"),
+                                                             transport.writes,
+                                                             len(transport.bytes),
+                                                             elapsed))
+
+"""
+    ICB handler pipeline:
+"""
+def encode_packet(T, *fields):
+    e = ltd.Encoder(T)
+
+    for i, f in enumerate(fields):
+        e.add_field_str(f, append_null=i == len(fields) - 1)
+
+    return e.encode()
+
+def encode_message(T, *fields):
+    return ltd.decode_message(T, encode_packet(T, *fields)[2:])
+
+async def feed_pipeline(handlers, messages):
+    p = pipeline.Pipeline(timerwheel.TimerWheel())
+
+    for i in range(handlers):
+        if i % 2:
+            p.add(client.AwayParser("user%d" % i), 60.0)
+        else:
+            p.add(client.ListParser(), 60.0)
+
+    start = timer()
+
+    for msg in messages:
+        p.feed(msg)
+
+    elapsed = timer() - start
+
+    p.clear()
+
+    return elapsed
+
+def icb_pipeline():
+    handlers, count = 50, 10000
+
+    samples = (encode_message("b", "nick", "hello world"),
+               encode_message("c", "nick", "hello world"),
+               encode_message("d", "Status", "Something happened"),
+               encode_message("i", "co", "Some command output"))
+
+    messages = [samples[i % len(samples)] for i in range(count)]
+
+    elapsed = asyncio.run(feed_pipeline(handlers, messages))
+
+    report("pipeline (%d handlers)" % handlers, count, "messages", elapsed)
+
+    if count / elapsed < 10000:
+        print("pipeline: below 10,000 messages/s")
+
+"""
+    status messages:
+"""
+STATUS_CORPUS = (("Status", "You are now in group lobby"),
+                 ("Sign-on", "alice (alice@example.org) entered group"),
+                 ("Arrive", "bob (bob@example.org) entered group"),
+                 ("Sign-off", "carol (carol@example.org) has signed off."),
+                 ("Depart", "dave (dave@example.org) just left"),
+                 ("Sign-off", "Your moderator (eve@example.org) has signed off."),
+                 ("Name", "alice changed nickname to alicia"),
+                 ("Topic", "bob changed the topic to \"weekend plans\""),
+                 ("Pass", "bob has passed moderation to alice"),
+                 ("Pass", "alice is now mod."),
+                 ("Change", "alice made group moderated."),
+                 ("Change", "alice made group secret."),
+                 ("Change", "Group is now quiet."),
+                 ("Change", "Group is now public."),
+                 ("Change", "alice just relinquished moderation."),
+                 ("Register", "Nick registered"),
+                 ("FYI", "You are invited to group secret by alice"),
+                 ("RSVP", "You can now talk in group lobby"),
+                 ("Boot", "alice was booted."),
+                 ("No-Pass", "Group is not moderated."))
+
+def legacy_parse_status(category, text):
+    # the if/elif chain of the original client, extracting the same values as the event parsers
+    if category == "Status":
+        m = re.match("You are now in group ([^\\s\\.]+)", text)
+
+        if m:
+            return m.group(1)
+    elif category == "Name":
+        m = re.match("([^\\s\\.]+) changed nickname to ([^\\s\\.]+)", text)
+
+        if m:
+            return m.group(1), m.group(2)
+    elif category == "Topic":
+        m = re.match(".* changed the topic to \"(.+)\"", text)
+
+        if m:
+            return m.group(1)
+    elif category == "Sign-on" or category == "Arrive":
+        parts = text.split(" ")
+
+        return parts[0], parts[1][1:-1]
+    elif category == "Sign-off" or category == "Depart":
+        if text.startswith("Your moderator"):
+            return None
+
+        return text.split(" ")[0]
+    elif category == "Pass":
+        m = re.match(r"(\w+) has passed moderation to (\w+)", text)
+
+        if m:
+            return m.group(2)
+
+        m = re.match(r"(\w+) is now mod", text)
+
+        return m.group(1) if m else None
+    elif category == "Register":
+        return text.startswith("Nick registered")
+    elif category == "Change":
+        m = re.match("\\w+ made group (\\w+)", text) or re.match("\\w+ is now (\\w+)", text)
+
+        if m:
+            return m.group(1)
+        elif "now public" in text:
+            return "public"
+
+        return "just relinquished moderation" in text
+    elif category == "FYI":
+        m = re.match(r"You are invited to group (\w+)", text)
+
+        if m:
+            return m.group(1)
+    elif category == "RSVP":
+        m = re.match(r"You can now talk in group (\w+)", text) or re.match(r"You are invited to group (\w+)", text)
+
+        if m:
+            return m.group(1)
+
+def status_parser():
+    rounds = 5000
+    count = rounds * len(STATUS_CORPUS)
+
+    def run_legacy():
+        for _ in range(rounds):
+            for category, text in STATUS_CORPUS:
+                legacy_parse_status(category, text)
+
+    def run_current():
+        for _ in range(rounds):
+            for category, text in STATUS_CORPUS:
+                client.parse_status_message(category, text)
+
+    report("status messages legacy", count, "messages", measure(run_legacy))
+    report("status messages current", count, "messages", measure(run_current))
+
+"""
+    idle timeouts:
+"""
+async def sleeping_tasks(count):
+    async def test_timeout():
+        while True:
+            await asyncio.sleep(60.0)
+
+    start = timer()
+
+    tasks = [asyncio.create_task(test_timeout()) for _ in range(count)]
+
+    await asyncio.sleep(0)
+
+    elapsed = timer() - start
+
+    for task in tasks:
+        task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    return elapsed
+
+async def wheel_deadlines(count, updates):
+    wheel = timerwheel.TimerWheel()
+
+    start = timer()
+
+    deadlines = [wheel.schedule(60.0, lambda: None) for _ in range(count)]
+
+    scheduled = timer() - start
+
+    start = timer()
+
+    for _ in range(updates):
+        for deadline in deadlines:
+            wheel.reschedule(deadline, 60.0)
+
+    rescheduled = timer() - start
+
+    for deadline in deadlines:
+        wheel.cancel(deadline)
+
+    return scheduled, rescheduled
+
+def idle_timeouts():
+    count = 20000
+    updates = 10
+
+    report("idle timeouts legacy (tasks)", count, "sessions", asyncio.run(sleeping_tasks(count)))
+
+    scheduled, rescheduled = asyncio.run(wheel_deadlines(count, updates))
+
+    report("idle timeouts timer wheel", count, "sessions", scheduled)
+    report("idle timeouts timer wheel (reschedule)", count * updates, "updates", rescheduled)
+
+"""
+    event loop:
+"""
+class StandInICB(asyncio.Protocol):
+    def __init__(self):
+        self.__decoder = ltd.Decoder()
+        self.__nick = None
+
+        self.__decoder.add_listener(self.__packet_received__)
+
+    def connection_made(self, transport):
+        self.__transport = transport
+
+        self.__transport.write(encode_packet("j", "1", "localhost", "stand-in"))
+
+    def data_received(self, data):
+        self.__decoder.write(data)
+
+    def __packet_received__(self, type_id, payload):
+        fields = ltd.Fields(payload)
+
+        if type_id == "a":
+            self.__nick = fields[1]
+
+            self.__transport.write(encode_packet("a"))
+            self.__transport.write(encode_packet("d", "Status", "You are now in group bench"))
+        elif type_id == "b":
+            self.__transport.write(encode_packet("b", self.__nick, fields[0]))
+        elif type_id == "l":
+            self.__transport.write(encode_packet("m"))
+        elif type_id == "h" and fields[0] == "w":
+            self.__transport.write(encode_packet("i", "co", "Group: bench  (rvl) Mod: %s  Topic: benchmark" % self.__nick))
+            self.__transport.write(encode_packet("i", "wl", "*", self.__nick, "0", "0", "1580000000", "bench", "localhost", ""))
+            self.__transport.write(encode_packet("i", "co", "Total: 1 users in 1 groups"))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+
+        return s.getsockname()[1]
+
+async def read_until(reader, marker):
+    while True:
+        line = await reader.readline()
+
+        if not line:
+            raise ConnectionError("Connection closed.")
+
+        if marker in line:
+            return line
+
+async def irc_connect(port, nick):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    writer.write(b"NICK %s\r\nUSER %s 0 * :%s\r\n" % (nick, nick, nick))
+
+    await read_until(reader, b" 366 ")
+
+    return reader, writer
+
+async def irc_chat(reader, writer, messages, latencies):
+    for i in range(messages):
+        start = timer()
+
+        writer.write(b"PRIVMSG #bench :%d\r\n" % i)
+
+        await read_until(reader, b"PRIVMSG")
+
+        latencies.append(timer() - start)
+
+async def relay(clients, messages):
+    logger = logging.getLogger("benchmark")
+    logger.setLevel(logging.CRITICAL)
+
+    loop = asyncio.get_running_loop()
+    icb_port, irc_port = free_port(), free_port()
+
+    icb = await loop.create_server(StandInICB, "127.0.0.1", icb_port)
+
+    preferences = config.Config(bindings=["tcp://127.0.0.1:%d" % irc_port],
+                                icb_endpoint="tcp://127.0.0.1:%d" % icb_port,
+                                server_max_clients=clients,
+                                server_message_rate=1000000.0,
+                                server_message_burst=1000,
+                                icb_rate=1000000.0,
+                                icb_burst=1000)
+
+    server = ircd.Server(logger, preferences, workers.ConnectionLimit(clients))
+    task = loop.create_task(server.run())
+
+    await asyncio.sleep(0.1)
+
+    start = timer()
+
+    connections = await asyncio.gather(*(irc_connect(irc_port, b"bench%d" % i) for i in range(clients)))
+
+    connect_elapsed = timer() - start
+
+    latencies = []
+
+    start = timer()
+
+    await asyncio.gather(*(irc_chat(reader, writer, messages, latencies) for reader, writer in connections))
+
+    chat_elapsed = timer() - start
+
+    for _, writer in connections:
+        writer.close()
+
+    server.close()
+    icb.close()
+
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    return connect_elapsed, chat_elapsed, latencies
+
+def event_loop():
+    clients = 50
+    messages = 200
+
+    for name in eventloop.BACKENDS:
+        if eventloop.available(name):
+            eventloop.install(name)
+
+            connect_elapsed, chat_elapsed, latencies = asyncio.run(relay(clients, messages))
+
+            latencies.sort()
+
+            report("relay connections (%s)" % name, clients, "connections", connect_elapsed)
+            report("relay messages (%s)" % name, len(latencies), "messages", chat_elapsed)
+            print("%-40s %12.3f ms" % ("relay p99 latency (%s)" % name, latencies[int(len(latencies) * 0.99)] * 1000))
+        else:
+            print("%-40s %12s" % ("relay (%s)" % name, "not installed"))
+
+    eventloop.install("asyncio")
+
+BENCHMARKS = {"ltd_decoder": ltd_decoder,
+              "ltd_fields": ltd_fields,
+              "ltd_encoder": ltd_encoder,
+              "irc_join": irc_join,
+              "message_chunker": message_chunker,
+              "icb_pipeline": icb_pipeline,
+              "status_parser": status_parser,
+              "idle_timeouts": idle_timeouts,
+              "event_loop": event_loop}
+
+def get_opts(argv):
+    _, args = getopt.getopt(argv, "")
+
+    for name in args:
+        if not name in BENCHMARKS:
+            raise getopt.GetoptError("Unknown benchmark: %s" % name)
+
+    return args or list(BENCHMARKS.keys())
+
+if __name__ == "__main__":
+    try:
+        for name in get_opts(sys.argv[1:]):
+            BENCHMARKS[name]()
+    except getopt.GetoptError as ex:
+        print(str(ex))
@@ -0,0 +1,67 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+from collections import OrderedDict
+from timeit import default_timer as timer
+
+class TTLCache:
+    def __init__(self, max_size, ttl, counters, name):
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__counters = counters
+        self.__name = name
+        self.__entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key, default=None):
+        entry = self.__entries.get(key)
+
+        if entry:
+            expires, value = entry
+
+            if expires > timer():
+                self.__entries.move_to_end(key)
+                self.__counters.increment("%s_hits" % self.__name)
+
+                return value
+
+            del self.__entries[key]
+
+        self.__counters.increment("%s_misses" % self.__name)
+
+        return default
+
+    def put(self, key, value, ttl=None):
+        self.__entries[key] = (timer() + (self.__ttl if ttl is None else ttl), value)
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last=False)
+            self.__counters.increment("%s_evictions" % self.__name)
+
+    def remove(self, key):
+        self.__entries.pop(key, None)
@@ -25,17 +25,185 @@
 """
 import asyncio
 import ltd
+import irc
 import re
 from enum import Enum
-import core
+import scheduler
+
+GROUP_JOINED_PATTERN = re.compile(r"You are now in group ([^\s\.]+)")
+NICK_CHANGED_PATTERN = re.compile(r"([^\s\.]+) changed nickname to ([^\s\.]+)")
+TOPIC_CHANGED_PATTERN = re.compile(r".* changed the topic to \"(.+)\"")
+MODERATOR_PASSED_PATTERN = re.compile(r"(\w+) (?:has passed moderation to (\w+)|is now mod)")
+GROUP_CHANGED_PATTERN = re.compile(r"\w+ (?:made group|is now) (\w+)")
+INVITED_PATTERN = re.compile(r"You are invited to group (\w+)")
+TALK_OR_INVITED_PATTERN = re.compile(r"You (?:can now talk in|are invited to) group (\w+)")
+GROUP_PATTERN = re.compile(r"Group: ([^\s\.]+)\s+\((\w{3})\) Mod: ([^\s\.]+)\s+Topic: (.*)")
+STATUS_NAME_PATTERN = re.compile(r"^Name: (\w+) Mod: .*")
+
+class StatusEvent:
+    __slots__ = ()
+
+class GroupJoined(StatusEvent):
+    __slots__ = ("group",)
+
+    def __init__(self, group):
+        self.group = group
+
+class NickChanged(StatusEvent):
+    __slots__ = ("old", "new")
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+
+class TopicChanged(StatusEvent):
+    __slots__ = ("topic",)
+
+    def __init__(self, topic):
+        self.topic = topic
+
+class MemberArrived(StatusEvent):
+    __slots__ = ("nick", "loginid")
+
+    def __init__(self, nick, loginid):
+        self.nick = nick
+        self.loginid = loginid
+
+class MemberLeft(StatusEvent):
+    __slots__ = ("nick",)
+
+    def __init__(self, nick):
+        self.nick = nick
+
+class ModeratorLeft(StatusEvent):
+    __slots__ = ()
+
+class ModeratorPassed(StatusEvent):
+    __slots__ = ("moderator",)
+
+    def __init__(self, moderator):
+        self.moderator = moderator
+
+class ModeratorRelinquished(StatusEvent):
+    __slots__ = ()
+
+class GroupStatusChanged(StatusEvent):
+    __slots__ = ("option",)
+
+    def __init__(self, option):
+        self.option = option
+
+class NickRegistered(StatusEvent):
+    __slots__ = ()
+
+class NickInUse(StatusEvent):
+    __slots__ = ()
+
+class Invited(StatusEvent):
+    __slots__ = ("group",)
+
+    def __init__(self, group):
+        self.group = group
+
+# events without attributes are shared
+MODERATOR_LEFT = ModeratorLeft()
+MODERATOR_RELINQUISHED = ModeratorRelinquished()
+NICK_REGISTERED = NickRegistered()
+NICK_IN_USE = NickInUse()
+
+def __parse_status__(text):
+    m = GROUP_JOINED_PATTERN.match(text)
+
+    if m:
+        return GroupJoined(m.group(1))
+
+def __parse_name__(text):
+    m = NICK_CHANGED_PATTERN.match(text)
+
+    if m:
+        return NickChanged(m.group(1), m.group(2))
+
+def __parse_topic__(text):
+    m = TOPIC_CHANGED_PATTERN.match(text)
+
+    if m:
+        return TopicChanged(m.group(1))
+
+def __parse_arrive__(text):
+    # "nick (loginid) entered group"
+    nick, sep, rest = text.partition(" (")
+
+    if nick and sep:
+        loginid, sep, _ = rest.partition(")")
+
+        if sep:
+            return MemberArrived(nick, loginid)
+
+def __parse_depart__(text):
+    if text.startswith("Your moderator"):
+        return MODERATOR_LEFT
+
+    return MemberLeft(text.split(" ", 1)[0])
+
+def __parse_pass__(text):
+    m = MODERATOR_PASSED_PATTERN.match(text)
+
+    return ModeratorPassed((m.group(2) or m.group(1)) if m else None)
+
+def __parse_register__(text):
+    if text.startswith("Nick registered"):
+        return NICK_REGISTERED
+    elif text.startswith("Nick already in use"):
+        return NICK_IN_USE
+
+def __parse_change__(text):
+    m = GROUP_CHANGED_PATTERN.match(text)
+
+    if m:
+        return GroupStatusChanged(m.group(1))
+    elif "now public" in text:
+        return GroupStatusChanged("public")
+    elif "just relinquished moderation" in text:
+        return MODERATOR_RELINQUISHED
+
+def __parse_fyi__(text):
+    m = INVITED_PATTERN.match(text)
+
+    if m:
+        return Invited(m.group(1))
+
+def __parse_rsvp__(text):
+    m = TALK_OR_INVITED_PATTERN.match(text)
+
+    if m:
+        return Invited(m.group(1))
+
+STATUS_PARSERS = {"Status": __parse_status__,
+                  "Name": __parse_name__,
+                  "Topic": __parse_topic__,
+                  "Sign-on": __parse_arrive__,
+                  "Arrive": __parse_arrive__,
+                  "Sign-off": __parse_depart__,
+                  "Depart": __parse_depart__,
+                  "Pass": __parse_pass__,
+                  "Register": __parse_register__,
+                  "Change": __parse_change__,
+                  "FYI": __parse_fyi__,
+                  "RSVP": __parse_rsvp__}
+
+def parse_status_message(category, text):
+    fn = STATUS_PARSERS.get(category)
+
+    if fn:
+        return fn(text)
 
 class ICBClientProtocol(asyncio.Protocol):
-    def __init__(self, on_conn_lost, queue):
+    def __init__(self, on_conn_lost, on_message):
         self.__on_conn_lost = on_conn_lost
         self.__transport = None
         self.__decoder = ltd.Decoder()
         self.__decoder.add_listener(self.__message_received__)
-        self.__queue = queue
+        self.__on_message = on_message
 
     def connection_made(self, transport):
         self.__transport = transport
@@ -44,6 +212,9 @@ class ICBClientProtocol(asyncio.Protocol):
         try:
             self.__decoder.write(data)
 
+        except asyncio.QueueFull:
+            self.__shutdown__(OverflowError("Too many pending ICB messages."))
+            self.__transport.abort()
         except Exception as ex:
             self.__shutdown__(ex)
 
@@ -51,10 +222,11 @@ class ICBClientProtocol(asyncio.Protocol):
         self.__shutdown__(ex)
 
     def __shutdown__(self, ex=None):
-        self.__on_conn_lost.set_result(ex)
+        if not self.__on_conn_lost.done():
+            self.__on_conn_lost.set_result(ex)
 
     def __message_received__(self, type_id, payload):
-        self.__queue.put_nowait((type_id, payload))
+        self.__on_message(ltd.decode_message(type_id, payload))
 
 class StateListener:
     def changed(self, name, old, new):
@@ -66,12 +238,65 @@ class StateListener:
     def member_added(self, nick, loginid):
         pass
 
+    def members_added(self, members):
+        for nick, loginid in members:
+            self.member_added(nick, loginid)
+
     def member_removed(self, nick, loginid):
         pass
 
-    def member_renamed(self, nick, loginid):
+    def member_renamed(self, old, new, loginid):
         pass
 
+class Members:
+    # (nick, loginid) pairs indexed by the normalized nick
+    def __init__(self):
+        self.__index = {}
+
+    def __len__(self):
+        return len(self.__index)
+
+    def __contains__(self, nick):
+        return irc.lower(nick) in self.__index
+
+    def __iter__(self):
+        return (nick for nick, _ in self.__index.values())
+
+    def __getitem__(self, nick):
+        return self.__index[irc.lower(nick)][1]
+
+    def items(self):
+        return self.__index.values()
+
+    def nick(self, nick):
+        entry = self.__index.get(irc.lower(nick))
+
+        return entry[0] if entry else None
+
+    def add(self, nick, loginid):
+        key = irc.lower(nick)
+
+        if key in self.__index:
+            return False
+
+        self.__index[key] = (nick, loginid)
+
+        return True
+
+    def remove(self, nick):
+        return self.__index.pop(irc.lower(nick), None)
+
+    def rename(self, old, new):
+        entry = self.__index.pop(irc.lower(old), None)
+
+        if entry:
+            self.__index[irc.lower(new)] = (new, entry[1])
+
+        return entry
+
+    def clear(self):
+        self.__index.clear()
+
 class State:
     def __init__(self):
         self.__nick = None
@@ -81,7 +306,7 @@ class State:
         self.__group_status = None
         self.__moderator = None
         self.__topic = None
-        self.__members = {}
+        self.__members = Members()
         self.__listeners = set()
 
     @property
@@ -142,7 +367,7 @@ class State:
 
     @property
     def members(self):
-        return self.__members.keys()
+        return self.__members
 
     def __change__(self, attr, v):
         old = getattr(self, attr)
@@ -164,31 +389,31 @@ class State:
         return self.__members[nick]
 
     def add_member(self, nick, loginid):
-        if not nick in self.__members:
-            self.__members[nick] = loginid
-
+        if self.__members.add(nick, loginid):
             for l in self.__listeners:
                 l.member_added(nick, loginid)
 
-    def remove_member(self, nick):
-        if nick in self.__members:
-            loginid = self.__members[nick]
-
-            del self.__members[nick]
+    def add_members(self, members):
+        # listeners are notified once per batch
+        added = [(nick, loginid) for nick, loginid in members if self.__members.add(nick, loginid)]
 
+        if added:
             for l in self.__listeners:
-                l.member_removed(nick, loginid)
+                l.members_added(added)
 
-    def rename_member(self, old, new):
-        if old in self.__members:
-            loginid = self.__members[old]
+    def remove_member(self, nick):
+        entry = self.__members.remove(nick)
 
-            del self.__members[old]
+        if entry:
+            for l in self.__listeners:
+                l.member_removed(*entry)
 
-            self.__members[new] = loginid
+    def rename_member(self, old, new):
+        entry = self.__members.rename(old, new)
 
+        if entry:
             for l in self.__listeners:
-                l.member_renamed(old, new, loginid)
+                l.member_renamed(entry[0], new, entry[1])
 
     def add_listener(self, l):
         self.__listeners.add(l)
@@ -196,29 +421,54 @@ class State:
     def remove_listener(self, l):
         self.__listeners.remove(l)
 
+CONTROL_COMMANDS = ("w", "status")
+
 class Client:
-    def __init__(self, host, port):
+    def __init__(self, host, port, max_pending_frames=0, rate=1.0, burst=1, groups=None):
         self.__host = host
         self.__port = port
-        self.__queue = asyncio.Queue()
-        self.__messages = asyncio.Queue()
+        self.__queue = asyncio.Queue(max_pending_frames)
+        self.__sink = None
+        self.__rate = rate
+        self.__burst = burst
+        self.__scheduler = None
         self.__transport = None
         self.__state = State()
+        self.__groups = groups
+        self.__group = None
+        self.__loginid = None
+        self.__pending_members = []
+        self.__listing_group = False
+        self.__pings = 0
+        self.__pongs = 0
+        self.__join_ping = 0
 
     @property
     def state(self):
         return self.__state
 
-    async def connect(self):
+    @property
+    def group(self):
+        # shared state of the current group, available if a group registry has been passed to the constructor
+        return self.__group
+
+    @property
+    def send_queue(self):
+        return self.__scheduler
+
+    async def connect(self, sink=None):
+        # messages are passed to sink as soon as they arrive, without a sink they are queued until read() is called
         loop = asyncio.get_event_loop()
 
         on_conn_lost = loop.create_future()
 
-        self.__transport, _ = await loop.create_connection(lambda: ICBClientProtocol(on_conn_lost, self.__queue),
+        self.__sink = sink
+
+        self.__transport, _ = await loop.create_connection(lambda: ICBClientProtocol(on_conn_lost, self.__message_received__),
                                                            self.__host,
                                                            self.__port)
 
-        loop.create_task(self.__send_messages__())
+        self.__scheduler = scheduler.Scheduler(self.__transport.write, self.__rate, self.__burst)
 
         return on_conn_lost
 
@@ -236,163 +486,226 @@ class Client:
         self.__transport.write(e.encode())
 
         self.__state.nick = nick
+        self.__loginid = "%s@%s" % (loginid, address) if address else loginid
 
-    async def __send_messages__(self):
-        while not self.__transport.is_closing():
-            try:
-                msg = await asyncio.wait_for(self.__messages.get(), timeout=30)
-
-                self.__transport.write(msg)
-
-                await asyncio.sleep(core.THROTTLE)
-
-            except asyncio.TimeoutError:
-                pass
-
-    def __write__(self, msg):
+    def __write__(self, msg, priority=scheduler.PRIORITY_NORMAL, packets=1):
         if not self.__transport.is_closing():
-            self.__messages.put_nowait(msg)
+            self.__scheduler.send(msg, priority, packets)
 
-    def send(self, msg):
-        self.__write__(msg)
+    def send(self, msg, packets=1):
+        # msg may contain several packets, e.g. a batch written by ltd.encode_chunks_into()
+        self.__write__(msg, packets=packets)
 
     def command(self, command, arg=""):
-        e = ltd.Encoder("h")
+        msg = None if arg else ltd.CONSTANT_COMMANDS.get(command)
 
-        e.add_field_str(command, append_null=False)
-        e.add_field_str(arg, append_null=True)
+        if not msg:
+            msg = ltd.encode_cmd(command, arg)
 
-        self.__write__(e.encode())
+        self.__write__(msg, scheduler.PRIORITY_HIGH if command in CONTROL_COMMANDS else scheduler.PRIORITY_NORMAL)
 
     def ping(self):
-        self.__write__(ltd.encode_empty_cmd("l"))
+        # pongs arrive in order, counting pings & pongs tells which ping has been answered
+        self.__pings += 1
+        self.__write__(ltd.PING, scheduler.PRIORITY_HIGH)
 
     def pong(self):
-        self.__write__(ltd.encode_empty_cmd("m"))
+        self.__write__(ltd.PONG, scheduler.PRIORITY_HIGH)
 
     def quit(self):
+        self.__release_group__()
+
+        if self.__scheduler:
+            self.__scheduler.close()
+
         self.__transport.close()
 
+    def __message_received__(self, msg):
+        if self.__sink:
+            self.__process_message__(msg)
+            self.__sink(msg)
+        else:
+            self.__queue.put_nowait(msg)
+
     async def read(self):
-        t, p = await self.__queue.get()
+        msg = await self.__queue.get()
+
+        self.__process_message__(msg)
+
+        return msg
+
+    def __process_message__(self, msg):
+        fn = self.__message_handlers__.get(msg.type_id)
+
+        if fn:
+            fn(self, msg)
 
-        fields = [f.decode("UTF-8").strip("\0") for f in ltd.split(p)]
+    def __ping_message__(self, msg):
+        self.pong()
 
-        self.__process_message__(t, fields)
+    def __pong_message__(self, msg):
+        self.__pongs += 1
 
-        return t, fields
+        self.__add_pending_members__()
+
+        # pongs of pings sent before the "w" listing of the joined group (e.g. by queries) don't complete the join
+        if self.__state.joining and self.__pongs >= self.__join_ping:
+            if self.__group:
+                # unchanged values don't fire change events, take them from the session's state
+                self.__group.group_status = self.__state.group_status
+                self.__group.moderator = self.__state.moderator
+                self.__group.topic = self.__state.topic
+                self.__group.complete = True
 
-    def __process_message__(self, t, fields):
-        if t == "l":
-            self.pong()
-        elif t == "m":
             self.__state.joining = False
-        elif t == "d":
-            self.__process_status_message__(t, fields)
-        elif t == "i":
-            self.__process_output_message__(t, fields)
-        elif t == "g":
-            self.quit()
-
-    def __process_status_message__(self, t, fields):
-        if len(fields) == 2:
-            if fields[0] == "Status":
-                m = re.match("You are now in group ([^\s\.]+)", fields[1])
 
-                if m:
-                    self.__state.group = m.group(1)
-                    self.__state.remove_all_members()
+    def __exit_message__(self, msg):
+        self.quit()
 
-                    self.command("w", ".")
-                    self.ping()
+    def __process_status_message__(self, msg):
+        if len(msg.fields) == 2:
+            msg.event = parse_status_message(msg.category, msg.text)
 
-                    self.__state.joining = True
-            elif fields[0] == "Name":
-                m = re.match("([^\s\.]+) changed nickname to ([^\s\.]+)", fields[1])
+            if msg.event:
+                self.__add_pending_members__()
 
-                if m:
-                    current = self.__state.nick
-                    old, new = m.group(1), m.group(2)
+                fn = self.__status_event_handlers__.get(type(msg.event))
 
-                    if old == self.__state.nick:
-                        self.__state.nick = m.group(2)
-                        self.__state.registered = False
+                if fn:
+                    fn(self, msg.event)
 
-                    self.__state.rename_member(old, new)
-            elif fields[0] == "Topic":
-                m = re.match(".* changed the topic to \"(.+)\"", fields[1])
+    def __group_joined__(self, event):
+        self.__release_group__()
 
-                if m:
-                    self.__state.topic = m.group(1)
-            elif fields[0] == "Sign-on" or fields[0] == "Arrive":
-                parts = fields[1].split(" ")
-
-                if(parts):
-                    self.__state.add_member(parts[0], parts[1][1:-1])
-            elif fields[0] == "Sign-off" or fields[0] == "Depart":
-                if fields[1].startswith("Your moderator"):
-                    self.__state.remove_member(self.__state.moderator)
-                    self.__state.moderator = None
-                else:
-                    parts = fields[1].split(" ")
+        self.__pending_members = []
+        self.__listing_group = False
 
-                    if parts:
-                        self.__state.remove_member(parts[0])
-            elif fields[0] == "Pass":
-                new_moderator = None
+        self.__state.group = event.group
+        self.__state.remove_all_members()
+        self.__state.joining = True
 
-                m = re.match(r"(\w+) has passed moderation to (\w+)", fields[1])
+        # the group line of the "w" listing may be missing, don't keep the values of the previous group
+        self.__state.group_status = None
+        self.__state.moderator = None
+        self.__state.topic = None
 
-                if m:
-                    new_moderator = m.group(2)
-                else:
-                    m = re.match(r"(\w+) is now mod", fields[1])
+        if self.__groups is not None:
+            self.__group = self.__groups.acquire(event.group)
 
-                    if m:
-                        new_moderator = m.group(1)
+            if self.__group.complete:
+                self.__join_from_cache__()
+                return
 
-                self.__state.moderator = new_moderator
-            elif fields[0] == "Register" and fields[1].startswith("Nick registered"):
-                self.__state.registered = True
-            elif fields[0] == "Change":
-                m = re.match("\w+ made group (\w+)", fields[1])
+            self.__state.add_listener(self.__group)
 
-                opt = ""
+        self.command("w", ".")
+        self.ping()
 
-                if m:
-                    opt = m.group(1)
-                else:
-                    m = re.match("\w+ is now (\w+)", fields[1])
+        self.__join_ping = self.__pings
+
+    def __join_from_cache__(self):
+        # another session tracks the group: take over its state instead of querying the server
+        self.__state.group_status = self.__group.group_status
+        self.__state.moderator = self.__group.moderator
+        self.__state.topic = self.__group.topic
+
+        self.__state.add_members(list(self.__group.members.items()))
+
+        self.__state.add_listener(self.__group)
+        self.__state.add_member(self.__state.nick, self.__loginid)
+
+        self.__state.joining = False
+
+    def __release_group__(self):
+        if self.__group:
+            self.__state.remove_listener(self.__group)
+            self.__groups.release(self.__group)
+
+            self.__group = None
+
+    def __nick_changed__(self, event):
+        if event.old == self.__state.nick:
+            self.__state.nick = event.new
+            self.__state.registered = False
+
+        self.__state.rename_member(event.old, event.new)
+
+    def __topic_changed__(self, event):
+        self.__state.topic = event.topic
+
+    def __member_arrived__(self, event):
+        self.__state.add_member(event.nick, event.loginid)
+
+    def __member_left__(self, event):
+        self.__state.remove_member(event.nick)
+
+    def __moderator_left__(self, event):
+        self.__state.remove_member(self.__state.moderator)
+        self.__state.moderator = None
+
+    def __moderator_passed__(self, event):
+        self.__state.moderator = event.moderator
+
+    def __moderator_relinquished__(self, event):
+        self.__state.moderator = None
+
+    def __nick_registered__(self, event):
+        self.__state.registered = True
+
+    def __group_status_changed__(self, event):
+        opt = event.option[0]
+        status = self.__state.group_status or "---"
+
+        if opt in "vsi":
+            self.__state.group_status = status[0] + opt + status[2]
+        elif opt in "pmrc":
+            self.__state.group_status = opt + status[1:]
+        elif opt in "qnl":
+            self.__state.group_status = status[:2] + opt
+
+    __status_event_handlers__ = {GroupJoined: __group_joined__,
+                                 NickChanged: __nick_changed__,
+                                 TopicChanged: __topic_changed__,
+                                 MemberArrived: __member_arrived__,
+                                 MemberLeft: __member_left__,
+                                 ModeratorLeft: __moderator_left__,
+                                 ModeratorPassed: __moderator_passed__,
+                                 ModeratorRelinquished: __moderator_relinquished__,
+                                 NickRegistered: __nick_registered__,
+                                 GroupStatusChanged: __group_status_changed__}
+
+    def __process_output_message__(self, msg):
+        fields = msg.fields
 
-                    if m:
-                        opt = m.group(1)
-                    elif "now public" in fields[1]:
-                        opt = "public"
-
-                if opt:
-                    opt = opt[0]
-
-                    if opt in "vsi":
-                        self.__state.group_status = self.__state.group_status[0] + opt + self.__state.group_status[2]
-                    elif opt in "pmrc":
-                        self.__state.group_status = opt + self.__state.group_status[1:]
-                    elif opt in "qnl":
-                        self.__state.group_status = self.__state.group_status[:2] + opt
-                elif "just relinquished moderation" in fields[1]:
-                    self.__state.moderator = None
-
-    def __process_output_message__(self, t, fields):
         if len(fields) >= 2:
             if fields[0] == "co":
-                m = re.match("Group: ([^\s\.]+)\s+\((\w{3})\) Mod: ([^\s\.]+)\s+Topic: (.*)", fields[1])
+                m = GROUP_PATTERN.match(fields[1])
 
                 if m:
-                    if len(fields) >= 2 and self.__state.joining:
+                    # a listing requested by another query may contain several groups, only the joined one is collected
+                    self.__listing_group = self.__state.joining and m.group(1).lower() == self.__state.group.lower()
+
+                    if self.__listing_group:
                         self.__state.group_status = m.group(2)
                         self.__state.moderator = m.group(3) if m.group(3) != "(None)" else None
                         self.__state.topic = m.group(4) if m.group(4) != "(None)" else None
-            elif fields[0] == "wl" and self.__state.joining:
-                self.__state.add_member(fields[2], "%s@%s" % (fields[6], fields[7]))
+                elif fields[1].startswith("Total:"):
+                    self.__listing_group = False
+            elif fields[0] == "wl" and self.__state.joining and self.__listing_group:
+                # collected & added at once when the listing is completed or interrupted by a status message
+                self.__pending_members.append((fields[2], "%s@%s" % (fields[6], fields[7])))
+
+    def __add_pending_members__(self):
+        if self.__pending_members:
+            self.__state.add_members(self.__pending_members)
+
+            self.__pending_members = []
+
+    __message_handlers__ = {ltd.PingMessage.type_id: __ping_message__,
+                            ltd.PongMessage.type_id: __pong_message__,
+                            ltd.StatusMessage.type_id: __process_status_message__,
+                            ltd.CommandOutput.type_id: __process_output_message__,
+                            ltd.ExitMessage.type_id: __exit_message__}
 
 class StatusParserState(Enum):
     WAITING = 0
@@ -402,10 +715,14 @@ class StatusParserState(Enum):
     COMPLETED = 4
 
 class StatusParser:
+    routes = ("i:co", "m")
+    quiet = False
+
     def __init__(self):
         self.__state = StatusParserState.WAITING
 
-    def feed(self, t, fields):
+    def feed(self, msg):
+        fields = msg.fields
         again = True
 
         while again:
@@ -413,15 +730,15 @@ class StatusParser:
 
             if self.__state != StatusParserState.COMPLETED:
                 if self.__state == StatusParserState.WAITING:
-                    if t == "i" and len(fields) == 2 and fields[0] == "co":
-                        m = re.match(r"^Name: (\w+) Mod: .*", fields[1])
+                    if msg.type_id == "i" and len(fields) == 2 and fields[0] == "co":
+                        m = STATUS_NAME_PATTERN.match(fields[1])
 
                         if m:
                             self.__state = StatusParserState.STARTED
 
                             self.begin(m.group(1))
                 else:
-                    if t != "i" or len(fields) != 2 or fields[0] != "co":
+                    if msg.type_id != "i" or len(fields) != 2 or fields[0] != "co":
                         self.end()
                         self.__state = StatusParserState.COMPLETED
                     else:
@@ -463,7 +780,7 @@ class StatusParser:
             elif self.__state == StatusParserState.READ_INVITATIONS:
                 self.__read_invitations__(line)
             elif self.__state == StatusParserState.READ_TALKERS:
-                self.__read_talkers(line)
+                self.__read_talkers__(line)
 
         return again
 
@@ -481,38 +798,44 @@ class StatusParser:
     def end(self):
         pass
 
-    def found_invitation(self, invitation):
+    def found_invitation(self, invitation, is_address):
         pass
 
-    def found_talker(self, talker):
+    def found_talker(self, talker, is_address):
         pass
 
     def stop(self):
         self.__state = StatusParserState.COMPLETED
 
+    def expire(self):
+        self.stop()
+
 class ListParserState(Enum):
     WAITING = 0
     READING = 1
     COMPLETED = 2
 
 class ListParser:
+    routes = ("i:co", "i:wl")
+    quiet = False
+
     def __init__(self):
         self.__state = ListParserState.WAITING
 
-    def feed(self, t, fields):
+    def feed(self, msg):
+        fields = msg.fields
+
         if self.__state == ListParserState.WAITING or self.__state == ListParserState.READING:
-            if t == "i" and len(fields) >= 2:
+            if msg.type_id == "i" and len(fields) >= 2:
                 if fields[0] == "co":
-                    m = re.match("Group: ([^\s\.]+)\s+\((\w{3})\) Mod: ([^\s\.]+)\s+Topic: (.*)", fields[1])
+                    m = GROUP_PATTERN.match(fields[1])
 
                     if m:
-                        if self.__state == ListParserState.READING:
-                            self.end()
-
                         self.begin(m.group(1), m.group(2), m.group(3) if m.group(3) != "(None)" else None, m.group(4) if m.group(4) != "(None)" else None)
 
                         self.__state = ListParserState.READING
                     elif fields[1].startswith("Total:"):
+                        self.__state = ListParserState.COMPLETED
                         self.end()
                 elif fields[0] == "wl" and len(fields) >= 9 and self.__state == ListParserState.READING:
                     is_mod = fields[1] != " "
@@ -534,18 +857,30 @@ class ListParser:
         pass
 
     def stop(self):
+        if self.__state != ListParserState.COMPLETED:
+            self.__state = ListParserState.COMPLETED
+            self.end()
+
+    def expire(self):
+        # the listing is incomplete, end() isn't called
         self.__state = ListParserState.COMPLETED
-        self.end()
 
 class AwayParser:
-    def __init__(self):
+    routes = ("d",)
+    quiet = False
+
+    def __init__(self, nick):
             self.__waiting = True
+            self.__prefix = nick.lower() + " "
 
             self.on_away_found = lambda msg: None
 
-    def feed(self, t, fields):
+    def feed(self, msg):
+        fields = msg.fields
+
         if self.__waiting:
-            if t == "d" and len(fields) >= 2 and fields[0] == "Away":
+            # several queries may be pending, accept only the message about the queried nick
+            if msg.type_id == "d" and len(fields) >= 2 and fields[0] == "Away" and fields[1].lower().startswith(self.__prefix):
                 self.__waiting = False
 
                 offset = fields[1].rfind("(")
@@ -553,3 +888,9 @@ class AwayParser:
                 self.on_away_found(fields[1][0:offset - 1:])
 
         return self.__waiting
+
+    def expire(self):
+        if self.__waiting:
+            self.__waiting = False
+
+            self.on_away_found(None)
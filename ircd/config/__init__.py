@@ -23,19 +23,30 @@
     ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
     OTHER DEALINGS IN THE SOFTWARE.
 """
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, replace
 from typing import List
 import copy
 import core
+from config.json import to_key
 
 @dataclass
 class Config:
     server_hostname: str = "localhost"
     server_max_clients: int = 100
     server_motd: str = "motd"
+    server_max_line_length: int = 512
+    server_max_input_bytes: int = 65536
+    server_message_rate: float = 1.0
+    server_message_burst: int = 5
+    server_message_queue_size: int = 50
+    server_message_queue_bytes: int = 16384
+    server_event_loop: str = "asyncio"
     bindings: List[str] = field(default_factory=list)
     logging_verbosity: core.Verbosity = core.Verbosity.INFO
     icb_endpoint: str = "tcp://localhost:7326"
+    icb_roster_ttl: float = 60.0
+    icb_rate: float = 1.0
+    icb_burst: int = 3
 
 def transform_map(m):
     m = copy.deepcopy(m)
@@ -46,6 +57,25 @@ def transform_map(m):
 
     return m
 
+BINDING_OPTIONS = ("server_message_rate",
+                   "server_message_burst",
+                   "server_message_queue_size",
+                   "server_message_queue_bytes")
+
+def for_binding(config, options):
+    types = {f.name: f.type for f in fields(config)}
+    m = {}
+
+    for k, v in options.items():
+        key = "server_%s" % to_key(k)
+
+        if not key in BINDING_OPTIONS:
+            raise ValueError("Unsupported binding option: %s" % k)
+
+        m[key] = types[key](v)
+
+    return replace(config, **m)
+
 def from_mapping(m):
     m = transform_map(m)
 
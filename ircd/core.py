@@ -36,7 +36,14 @@ class Verbosity(Enum):
     CRITICAL = 0
 
 AWAY_CACHE_TIMEOUT = 120.0
+AWAY_CACHE_SIZE = 1024
 PING_TIMEOUT = 55.0
 CONNECTION_TIMEOUT = 60.0
-TIME_BETWEEN_MESSAGES = 1.0
-THROTTLE = 1.0
+OUTPUT_FLUSH_THRESHOLD = 16384
+QUERY_TIMEOUT = 30.0
+DNS_TIMEOUT = 2.0
+DNS_CACHE_SIZE = 4096
+DNS_CACHE_TTL = 3600.0
+DNS_NEGATIVE_TTL = 300.0
+MOTD_CHECK_INTERVAL = 5.0
+TIMER_RESOLUTION = 1.0
@@ -0,0 +1,53 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+
+BACKENDS = ("asyncio", "uvloop")
+
+def available(name):
+    if name == "uvloop":
+        try:
+            import uvloop
+        except ImportError:
+            return False
+
+    return name in BACKENDS
+
+def install(name):
+    # installs the event loop policy of the given backend & returns the name of the installed backend
+    if not name in BACKENDS:
+        raise ValueError("Unsupported event loop: %s" % name)
+
+    if name == "uvloop" and available(name):
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    else:
+        name = "asyncio"
+
+        asyncio.set_event_loop_policy(None)
+
+    return name
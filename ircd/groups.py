@@ -0,0 +1,90 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import client
+
+class Group(client.StateListener):
+    def __init__(self, name):
+        client.StateListener.__init__(self)
+
+        self.name = name
+        self.group_status = None
+        self.moderator = None
+        self.topic = None
+        self.members = client.Members()
+        self.complete = False
+        self.refs = 0
+
+    def changed(self, name, old, new):
+        if name in ("group_status", "moderator", "topic"):
+            setattr(self, name, new)
+
+    def member_added(self, nick, loginid):
+        self.members.add(nick, loginid)
+
+    def members_added(self, members):
+        for nick, loginid in members:
+            self.members.add(nick, loginid)
+
+    def member_removed(self, nick, loginid):
+        self.members.remove(nick)
+
+    def member_renamed(self, old, new, loginid):
+        self.members.rename(old, new)
+
+class Registry:
+    def __init__(self, counters):
+        self.__counters = counters
+        self.__groups = {}
+
+    def __len__(self):
+        return len(self.__groups)
+
+    def lookup(self, name):
+        return self.__groups.get(name.lower())
+
+    def acquire(self, name):
+        key = name.lower()
+        group = self.__groups.get(key)
+
+        if group and group.complete:
+            self.__counters.increment("group_cache_hits")
+        else:
+            self.__counters.increment("group_cache_misses")
+
+        if not group:
+            group = Group(name)
+
+            self.__groups[key] = group
+
+        group.refs += 1
+
+        return group
+
+    def release(self, group):
+        group.refs -= 1
+
+        if group.refs == 0:
+            del self.__groups[group.name.lower()]
@@ -0,0 +1,73 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+class Flight:
+    def __init__(self):
+        self.callbacks = []
+        self.handle = None
+
+class Registry:
+    def __init__(self, counters, timeout, timers):
+        self.__counters = counters
+        self.__timeout = timeout
+        self.__timers = timers
+        self.__flights = {}
+
+    def __len__(self):
+        return len(self.__flights)
+
+    def request(self, key, start, callback):
+        flight = self.__flights.get(key)
+
+        if flight:
+            flight.callbacks.append(callback)
+
+            self.__counters.increment("queries_coalesced")
+        else:
+            flight = Flight()
+
+            flight.callbacks.append(callback)
+            flight.handle = self.__timers.schedule(self.__timeout, self.__timeout__, key, flight)
+
+            self.__flights[key] = flight
+
+            self.__counters.increment("queries_sent")
+
+            start(lambda result: self.__complete__(key, flight, result))
+
+    def __timeout__(self, key, flight):
+        self.__counters.increment("queries_timed_out")
+
+        self.__complete__(key, flight, None)
+
+    def __complete__(self, key, flight, result):
+        if self.__flights.get(key) is flight:
+            del self.__flights[key]
+
+            self.__timers.cancel(flight.handle)
+
+            for f in flight.callbacks:
+                f(result)
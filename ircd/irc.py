@@ -23,13 +23,45 @@
     ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
     OTHER DEALINGS IN THE SOFTWARE.
 """
-import io
+import string
+
+MAX_LINE_LENGTH = 512
+
+CASEMAP = str.maketrans(string.ascii_uppercase + "[]\\~", string.ascii_lowercase + "{}|^")
+
+def lower(nick):
+    # RFC1459 casemapping
+    return nick.translate(CASEMAP)
+
+def pack_list(prefix, items, max_length=MAX_LINE_LENGTH):
+    # join items into as few lines as possible without exceeding max_length bytes (including CR-LF)
+    available = max_length - len(prefix.encode("utf-8")) - 2
+    line, length = [], 0
+
+    for item in items:
+        size = len(item.encode("utf-8"))
+
+        if line and length + 1 + size > available:
+            yield prefix + " ".join(line)
+
+            line, length = [], 0
+
+        length += size + 1 if line else size
+        line.append(item)
+
+    if line:
+        yield prefix + " ".join(line)
+
+class InputLimitExceeded(Exception):
+    pass
 
 class Decoder:
-    def __init__(self):
-        self.__buffer = io.BytesIO()
+    def __init__(self, max_line_length=None, max_buffer_size=None):
+        self.__max_line_length = max_line_length
+        self.__max_buffer_size = max_buffer_size
+        self.__buffer = bytearray()
+        self.__scanned = 0
         self.__listeners = []
-        self.__crlf = bytearray((13, 10))
 
     def add_listener(self, listener):
         self.__listeners.append(listener)
@@ -38,26 +70,46 @@ class Decoder:
         self.__listeners.remove(listener)
 
     def write(self, data):
-        self.__buffer.write(data)
+        self.__buffer.extend(data)
         self.__process__()
 
+        # complete lines have been consumed, only the remainder counts
+        if self.__max_buffer_size and len(self.__buffer) > self.__max_buffer_size:
+            raise InputLimitExceeded("Input buffer exceeded.")
+
     def __process__(self):
-        bytes = self.__buffer.getvalue()
+        buffer = self.__buffer
+        start = 0
+
+        try:
+            # lines end with LF, an optional CR in front of it is stripped
+            offset = buffer.find(b"\n", self.__scanned)
+
+            while offset != -1:
+                if self.__max_line_length and offset + 1 - start > self.__max_line_length:
+                    raise InputLimitExceeded("Input line too long.")
+
+                end = offset
+
+                if end > start and buffer[end - 1] == 13:
+                    end -= 1
 
-        offset = (bytes.find(self.__crlf))
+                line = buffer[start:end].decode("utf-8").lstrip()
 
-        if offset != -1:
-            line = bytes[:offset].decode("utf-8").lstrip()
+                start = offset + 1
 
-            if line:
-                self.__process_line__(line.lstrip())
+                if line:
+                    self.__process_line__(line)
 
-            rest = bytes[offset + 2:]
+                offset = buffer.find(b"\n", start)
 
-            self.__buffer = io.BytesIO(rest)
+            if self.__max_line_length and len(buffer) - start > self.__max_line_length:
+                raise InputLimitExceeded("Input line too long.")
+        finally:
+            if start:
+                del buffer[:start]
 
-            if rest:
-                self.__process__()
+            self.__scanned = len(buffer)
 
     def __process_line__(self, line):
         prefix, rest = "", line
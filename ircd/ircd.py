@@ -29,13 +29,11 @@ import os.path
 import getopt
 import sys
 import os
-import socket
+import ssl
 import traceback
 from secrets import token_hex
 import signal
-import re
 from dataclasses import dataclass
-from textwrap import wrap
 import core
 import config
 import config.json
@@ -45,71 +43,104 @@ import url
 import client
 import ltd
 import validate
-import timer
+import timerwheel
+import metrics
+import roster
+import inflight
+import cache
+import pipeline
+import outbox
+import groups
+import workers
+import eventloop
+import resolver
+import motd
 
 @dataclass
 class Session:
     nick: str = ""
     loginid: str = ""
     host: str = ""
+    send_queue: object = None
 
     @property
     def clientid(self):
         return "%s!~%s@%s" % (self.nick, self.loginid, self.host)
 
+@dataclass
+class Shared:
+    connections: dict
+    counters: metrics.Counters
+    roster: roster.Roster
+    queries: inflight.Registry
+    away_cache: cache.TTLCache
+    groups: groups.Registry
+    limit: workers.ConnectionLimit
+    resolver: resolver.Resolver
+    welcome: motd.Template
+    motd: motd.MOTD
+    timers: timerwheel.TimerWheel
+
 class MembersFromStatus(client.StatusParser):
-    def __init__(self, group, list_type):
+    def __init__(self, group):
         super().__init__()
 
         self.__group = group
-        self.__type = list_type
-
         self.__found_group = None
+        self.__invitations = []
+        self.__talkers = []
 
-        self.on_found = lambda i: None
-        self.on_end = lambda: None
+        self.on_end = lambda result: None
 
     def begin(self, group):
         self.__found_group = group
+        self.__invitations = []
+        self.__talkers = []
 
     def found_invitation(self, invitation, is_address):
-        if self.__type == "invitation":
-            self.on_found(invitation)
+        self.__invitations.append(invitation)
 
     def found_talker(self, talker, is_address):
-        if self.__type == "talker":
-            self.on_found(talker)
+        self.__talkers.append(talker)
 
     def end(self):
-        self.on_end()
-
-        if self.__found_group.lower() == self.__group.lower():
+        if self.__found_group and self.__found_group.lower() == self.__group.lower():
             self.stop()
 
-class FindUser(client.ListParser):
-    def __init__(self, nick):
+            self.on_end((self.__invitations, self.__talkers))
+
+    def expire(self):
+        super().expire()
+
+        self.on_end(None)
+
+class UserListParser(client.ListParser):
+    quiet = True
+
+    def __init__(self):
         super().__init__()
 
-        self.__nick = nick
-        self.__args = None
+        self.__group = None
+        self.__users = []
 
-        self.on_found = lambda is_mod, nick, idle, loginid, host, status: None
-        self.on_not_found = lambda: None
+        self.on_end = lambda users: None
 
-    def found_user(self, is_mod, nick, idle, loginid, host, status):
-        if nick.lower() == self.__nick.lower():
-            self.__args = (is_mod, nick, idle, loginid, host, status)
+    def begin(self, group, status, moderator, topic):
+        self.__group = group
 
-            self.stop()
+    def found_user(self, is_mod, nick, idle, loginid, host, status):
+        self.__users.append(roster.User(is_mod, nick, idle, loginid, host, status, self.__group))
 
     def end(self):
-        if self.__args:
-            self.on_found(*self.__args)
-        else:
-            self.on_not_found()
+        self.on_end(self.__users)
+
+    def expire(self):
+        super().expire()
+
+        self.on_end(None)
 
 class IRCServerProtocol(asyncio.Protocol, client.StateListener):
-    def __init__(self, config, log, connections):
+    def __init__(self, config, log, shared):
         asyncio.Protocol.__init__(self)
         client.StateListener.__init__(self)
 
@@ -117,18 +148,34 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
 
         self.__config = config
         self.__log = log
-        self.__connections = connections
+        self.__connections = shared.connections
+        self.__counters = shared.counters
+        self.__roster = shared.roster
+        self.__queries = shared.queries
+        self.__away_cache = shared.away_cache
+        self.__groups = shared.groups
+        self.__limit = shared.limit
+        self.__counted = False
+        self.__resolver = shared.resolver
+        self.__welcome = shared.welcome
+        self.__motd = shared.motd
+        self.__host_f = None
+        self.__login_started = False
         self.__icb_host = binding["address"]
         self.__icb_port = binding["port"]
         self.__session_id = token_hex(20)
         self.__session = Session()
         self.__client = None
-        self.__decoder = irc.Decoder()
+        self.__outbox = None
+        self.__decoder = irc.Decoder(config.server_max_line_length, config.server_max_input_bytes)
         self.__shutdown = False
-        self.__handlers = []
-        self.__away_cache = {}
-        self.__idle = timer.Timer()
-        self.__message_timer = timer.Timer()
+        self.__output = bytearray()
+        self.__flush_scheduled = False
+        self.__timers = shared.timers
+        self.__handlers = pipeline.Pipeline(shared.timers)
+        self.__quiet = False
+        self.__idle = None
+        self.__pinged = False
 
         self.__decoder.add_listener(self.__on_message__)
 
@@ -140,11 +187,12 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         self.__address = address[0]
         self.__transport = transport
 
-        if len(self.__connections) == self.__config.server_max_clients:
+        if not self.__limit.acquire():
             self.__log.warning("Connection limit exceeded.")
 
             self.__transport.close()
         else:
+            self.__counted = True
             self.__connections[self.__session_id] = self.__session
 
             cipher = transport.get_extra_info("cipher")
@@ -154,18 +202,31 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
 
             loop = asyncio.get_running_loop()
 
-            loop.create_task(self.__test_timeout__())
+            self.__host_f = loop.create_task(self.__resolver.resolve(self.__address))
+
+            self.__idle = self.__timers.schedule(core.PING_TIMEOUT, self.__idle_timeout__)
 
     def data_received(self, data):
         if not self.__shutdown:
             try:
                 self.__decoder.write(data)
-                self.__idle.restart()
 
+                if self.__idle:
+                    self.__pinged = False
+                    self.__timers.reschedule(self.__idle, core.PING_TIMEOUT)
+
+            except irc.InputLimitExceeded as ex:
+                self.__log.info("Input overflow, session=%s: %s", self.__session_id, ex)
+
+                self.__counters.increment("irc_input_overflows")
+
+                self.__writeln__("ERROR :%s", ex)
+                self.__shutdown = True
+                self.__close__()
             except:
                 self.__log.warning(traceback.format_exc())
 
-                self.__transport.close()
+                self.__close__()
 
     def connection_lost(self, ex):
         if ex:
@@ -178,6 +239,20 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
 
         self.__shutdown = True
 
+        self.__roster.remove_provider(self.__refresh_roster__)
+        self.__handlers.clear()
+
+        if self.__host_f:
+            self.__host_f.cancel()
+
+        if self.__idle:
+            self.__timers.cancel(self.__idle)
+
+        try:
+            self.__outbox.close()
+        except AttributeError:
+            pass
+
         try:
             self.__client.quit()
         except AttributeError:
@@ -186,26 +261,26 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         if self.__session_id in self.__connections:
             del self.__connections[self.__session_id]
 
-        self.__transport.abort()
-
-    async def __test_timeout__(self):
-        while not self.__shutdown:
-            elapsed = self.__idle.elapsed()
+        if self.__counted:
+            self.__counted = False
+            self.__limit.release()
 
-            if elapsed >= core.CONNECTION_TIMEOUT:
-                self.__log.info("Connection timeout, session=%s", self.__session_id)
+        self.__transport.abort()
 
-                self.__shutdown = True
+    def __idle_timeout__(self):
+        if self.__shutdown:
+            pass
+        elif self.__pinged:
+            self.__log.info("Connection timeout, session=%s", self.__session_id)
 
-                self.__transport.close()
-            elif elapsed >= core.PING_TIMEOUT:
-                self.__writeln__(":%s PING :%s", self.__config.server_hostname, self.__config.server_hostname)
+            self.__shutdown = True
 
-                seconds = core.CONNECTION_TIMEOUT - elapsed
-            else:
-                seconds = core.PING_TIMEOUT - elapsed
+            self.__close__()
+        else:
+            self.__writeln__(":%s PING :%s", self.__config.server_hostname, self.__config.server_hostname)
 
-            await asyncio.sleep(seconds)
+            self.__pinged = True
+            self.__timers.reschedule(self.__idle, core.CONNECTION_TIMEOUT - core.PING_TIMEOUT)
 
     """
         receive & handle IRC messages:
@@ -214,23 +289,33 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         self.__log.debug("Message received: session=%s, prefix=%s, command=%s, params=%s", self.__session_id, prefix, command, params)
 
         if not self.__client:
-            self.__pre_login__(prefix, command, params)
+            self.__pre_login__(command.upper(), params)
         else:
-            self.__post_login__(prefix, command, params)
+            self.__post_login__(command.upper(), params)
 
-    def __pre_login__(self, prefix, command, params):
-        fn = None
+    def __pre_login__(self, command, params):
+        handler = self.__pre_login_commands__.get(command)
 
-        try:
-            fn = getattr(self, "__%s_received_pre__" % command.lower())
-        except AttributeError:
-            pass
+        if handler:
+            fn, min_params = handler
 
-        if fn:
-            fn(params)
+            if len(params) < min_params:
+                self.__need_more_params__(command)
+            else:
+                fn(self, params)
+
+                if self.__session.nick and self.__session.loginid and not self.__login_started:
+                    self.__login_started = True
+
+                    asyncio.create_task(self.__login__())
 
-            if self.__session.nick and self.__session.loginid:
-                asyncio.create_task(self.__run_icb_client__(self.__session.loginid, self.__session.nick, "1", ""))
+    async def __login__(self):
+        try:
+            self.__session.host = await self.__host_f
+        except asyncio.CancelledError:
+            return
+
+        await self.__run_icb_client__(self.__session.loginid, self.__session.nick, "1", "")
 
     def __nick_received_pre__(self, params):
         if len(params) != 1 or not validate.is_valid_nick(params[0]):
@@ -245,20 +330,31 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
             self.__die__(461, "No valid hostname found.")
         else:
             self.__session.loginid = params[0]
-            self.__session.host = socket.getfqdn(self.__address)
 
-    def __post_login__(self, prefix, command, params):
-        fn = None
+    __pre_login_commands__ = {"NICK": (__nick_received_pre__, 0),
+                              "USER": (__user_received_pre__, 0)}
 
-        try:
-            fn = getattr(self, "__%s_received__" % command.lower())
-        except AttributeError:
+    def __post_login__(self, command, params):
+        handler = self.__post_login_commands__.get(command)
+
+        if handler:
+            fn, min_params = handler
+
+            if len(params) < min_params:
+                self.__need_more_params__(command)
+            else:
+                try:
+                    fn(self, params)
+                except OverflowError:
+                    # parameters don't fit into an ICB packet
+                    self.__writeln__(":%s 417 %s :Input line was too long.", self.__config.server_hostname, self.__session.nick)
+        elif not command.isdigit():
             self.__log.debug("Unknown command: %s", command)
-        except:
-            pass
 
-        if fn:
-            fn(params)
+            self.__writeln__(":%s 421 %s %s :Unknown command.", self.__config.server_hostname, self.__session.nick, command)
+
+    def __need_more_params__(self, command):
+        self.__writeln__(":%s 461 %s %s :Not enough parameters.", self.__config.server_hostname, self.__session.nick or "*", command)
 
     def __ping_received__(self, params):
         self.__writeln__("PONG %s", self.__config.server_hostname)
@@ -267,13 +363,10 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         self.__send_motd__()
 
     def __mode_received__(self, params):
-        if len(params) >= 1:
-            if params[0].startswith("#"):
-                self.__channel_mode__(params[0][1:], params[1:])
-            else:
-                self.__user_mode__(params[0], params[1:])
+        if params[0].startswith("#"):
+            self.__channel_mode__(params[0][1:], params[1:])
         else:
-            self.__writeln__(":%s 462 %s mode :Not enough Parameters.", self.__config.server_hostname, self.__session.nick)
+            self.__user_mode__(params[0], params[1:])
 
     def __channel_mode__(self, channel, params):
         if channel.lower() == self.__client.state.group.lower():
@@ -302,7 +395,7 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
             self.__writeln__(":%s 221 %s +i", self.__config.server_hostname, user)
 
     def __send_channel_mode__(self):
-        flags = self.__map_group_status__(self.__client.state.group_status)
+        flags = self.__map_group_status__(self.__group_state__().group_status)
 
         self.__writeln__(":%s 324 %s #%s %s", self.__config.server_hostname, self.__session.nick, self.__client.state.group, flags)
 
@@ -313,25 +406,28 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         self.__writeln__(":%s 349 %s :End of EXCEPTION list", self.__config.server_hostname, self.__session.nick)
 
     def __send_invitations__(self):
-        self.__client.command("status")
-        self.__client.ping()
-
+        group = self.__client.state.group
+        status = self.__client.state.group_status or "---"
         list_type = ""
 
-        if self.__client.state.group_status[0] == "r":
+        if status[0] == "r":
             list_type = "invitation"
-        elif self.__client.state.group_status[0] == "c":
+        elif status[0] == "c":
             list_type = "talker"
 
         if list_type:
-            p = MembersFromStatus(self.__client.state.group, list_type)
+            self.__query_status__(group, lambda result: self.__send_invitation_list__(group, list_type, result))
+        else:
+            self.__writeln__(":%s 347 %s #%s :End of INVITATION list", self.__config.server_hostname, self.__session.nick, group)
 
-            p.on_found = lambda n: self.__writeln__(":%s 346 %s #%s :%s", self.__config.server_hostname, self.__session.nick, self.__client.state.group, n)
-            p.on_end = lambda: self.__writeln__(":%s 347 %s #%s :End of INVITATION list", self.__config.server_hostname, self.__session.nick, self.__client.state.group)
+    def __send_invitation_list__(self, group, list_type, result):
+        if result:
+            invitations, talkers = result
 
-            self.__handlers.append(p)
-        else:
-            self.__writeln__(":%s 347 %s #%s :End of INVITATION list", self.__config.server_hostname, self.__session.nick, self.__client.state.group)
+            for n in invitations if list_type == "invitation" else talkers:
+                self.__writeln__(":%s 346 %s #%s :%s", self.__config.server_hostname, self.__session.nick, group, n)
+
+        self.__writeln__(":%s 347 %s #%s :End of INVITATION list", self.__config.server_hostname, self.__session.nick, group)
 
     def __channel_mode_changed__(self, old, new):
         old = self.__map_group_status__(old)[1:]
@@ -353,28 +449,95 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
             self.__writeln__(":%s MODE #%s +o %s", self.__config.server_hostname, self.__client.state.group, new)
 
     def __who_received__(self, params):
-        for p in params:
-            if p != "o":
-                self.__writeln__(":%s 315 %s %s :End of WHO list", self.__config.server_hostname, self.__session.nick, p)
+        mask = params[0] if params else "*"
+        state = self.__client.state
+
+        if mask.startswith("#"):
+            if state.group and mask[1:].lower() == state.group.lower():
+                for nick in state.members:
+                    loginid, _, host = state.lookup_member(nick).partition("@")
+
+                    self.__send_who_entry__(mask, nick, loginid, host, self.__roster.lookup(nick))
+        else:
+            user = self.__roster.lookup(mask)
+
+            if user:
+                self.__send_who_entry__("#" + user.group if user.group else "*", user.nick, user.loginid, user.host, user)
+
+        self.__writeln__(":%s 315 %s %s :End of WHO list", self.__config.server_hostname, self.__session.nick, mask)
+
+    def __send_who_entry__(self, channel, nick, loginid, host, user):
+        flags = "G" if user and "aw" in user.status else "H"
+
+        if user and user.is_mod:
+            flags += "@"
+
+        self.__writeln__(":%s 352 %s %s %s %s %s %s %s :0 %s",
+                         self.__config.server_hostname,
+                         self.__session.nick,
+                         channel,
+                         loginid,
+                         host,
+                         self.__config.server_hostname,
+                         nick,
+                         flags,
+                         loginid)
+
+    def __ison_received__(self, params):
+        query = [nick for p in params for nick in p.split()]
+
+        if self.__roster.expired:
+            self.__list_users__(lambda users: self.__send_ison_from_list__(query, users))
+        else:
+            self.__send_ison__(query)
+
+    def __send_ison_from_list__(self, query, users):
+        if users is None:
+            self.__writeln__(":%s 263 %s ISON :Please wait a while and try again.", self.__config.server_hostname, self.__session.nick)
+        else:
+            self.__send_ison__(query)
+
+    def __send_ison__(self, query):
+        nicks = []
+
+        for nick in query:
+            user = self.__roster.lookup(nick)
+
+            if user:
+                nicks.append(user.nick)
+
+        self.__writeln__(":%s 303 %s :%s", self.__config.server_hostname, self.__session.nick, " ".join(nicks))
 
     def __whois_received__(self, params):
-        if len(params) > 0:
-            if len(params) >= 2 and params[0] != self.__config.server_hostname:
-                self.__writeln__(":%s 402 %s %s :No such server.", self.__config.server_hostname, self.__session.nick, params[0])
-            else:
-                query = params[0]
+        if len(params) >= 2 and params[0] != self.__config.server_hostname:
+            self.__writeln__(":%s 402 %s %s :No such server.", self.__config.server_hostname, self.__session.nick, params[0])
+        else:
+            query = params[0]
+
+            if len(params) >= 2:
+                query = params[1]
+
+            user = None if self.__roster.expired else self.__roster.lookup(query)
 
-                if len(params) >= 2:
-                    query = params[1]
+            if user:
+                self.__send_whois__(user.is_mod, user.nick, user.idle + int(self.__roster.age), user.loginid, user.host, user.status)
+            else:
+                self.__list_users__(lambda users: self.__send_whois_from_list__(query, users))
 
-                p = FindUser(query)
+    def __send_whois_from_list__(self, query, users):
+        if users is None:
+            self.__writeln__(":%s 263 %s WHOIS :Please wait a while and try again.", self.__config.server_hostname, self.__session.nick)
+            return
 
-                p.on_found = self.__send_whois__
-                p.on_not_found = lambda: self.__writeln__(":%s 401 %s %s :No such nick.", self.__config.server_hostname, self.__session.nick, query)
+        user = self.__roster.lookup(query)
 
-                self.__handlers.append(p)
+        if user:
+            self.__send_whois__(user.is_mod, user.nick, user.idle, user.loginid, user.host, user.status)
+        else:
+            self.__writeln__(":%s 401 %s %s :No such nick.", self.__config.server_hostname, self.__session.nick, query)
 
-                self.__client.command("w")
+    def __refresh_roster__(self):
+        self.__list_users__(lambda users: None)
 
     def __send_whois__(self, is_mod, nick, idle, loginid, host, status):
         self.__writeln__(":%s 311 %s %s %s %s * :%s", self.__config.server_hostname, self.__session.nick, nick, loginid, host, loginid)
@@ -386,28 +549,12 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         self.__writeln__(":%s 317 %s %s %d :seconds idle", self.__config.server_hostname, self.__session.nick, nick, idle)
 
         if "aw" in status:
-            text = None
-            key = nick.lower()
-
-            if key in self.__away_cache:
-                m = self.__away_cache[key]
-
-                if m["timer"].elapsed() <= core.AWAY_CACHE_TIMEOUT:
-                    text = m["text"]
-                else:
-                    del self.__away_cache[key]
+            text = self.__away_cache.get(nick.lower())
 
             if text:
                 self.__end_of_whois__(nick, text)
             else:
-                p = client.AwayParser()
-
-                p.on_away_found = lambda text: self.__end_of_whois__(nick, away_message=text, update_cache=True)
-
-                self.__handlers.append(p)
-
-                self.__client.command("beep", nick)
-                self.__client.ping()
+                self.__query_away__(nick, lambda text: self.__end_of_whois__(nick, away_message=text, update_cache=True))
         else:
             self.__end_of_whois__(nick)
 
@@ -416,12 +563,69 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
             self.__writeln__(":%s 301 %s %s :%s", nick, self.__config.server_hostname, nick, away_message)
 
             if update_cache:
-                self.__away_cache[nick.lower()] = {"timer": timer.Timer(), "text": away_message}
+                self.__away_cache.put(nick.lower(), away_message)
 
         self.__writeln__(":%s 318 %s %s: End of WHOIS", self.__config.server_hostname, self.__session.nick, nick)
 
+    def __names_received__(self, params):
+        if not params or params[0][1:].lower() == self.__client.state.group.lower():
+            self.__send_names__()
+        else:
+            self.__writeln__(":%s 366 %s %s :End of NAMES list", self.__config.server_hostname, self.__session.nick, params[0])
+
+    """
+        shared ICB queries:
+    """
+    def __list_users__(self, callback):
+        def start(done):
+            p = UserListParser()
+
+            def on_end(users):
+                if users is not None:
+                    self.__roster.update(users)
+
+                    for u in users:
+                        if not "aw" in u.status:
+                            self.__away_cache.remove(u.nick.lower())
+
+                done(users)
+
+            p.on_end = on_end
+
+            self.__handlers.add(p, core.QUERY_TIMEOUT)
+
+            self.__client.command("w")
+
+        self.__queries.request(("w",), start, callback)
+
+    def __query_status__(self, group, callback):
+        def start(done):
+            p = MembersFromStatus(group)
+
+            p.on_end = done
+
+            self.__handlers.add(p, core.QUERY_TIMEOUT)
+
+            self.__client.command("status")
+            self.__client.ping()
+
+        self.__queries.request(("status", group.lower()), start, callback)
+
+    def __query_away__(self, nick, callback):
+        def start(done):
+            p = client.AwayParser(nick)
+
+            p.on_away_found = done
+
+            self.__handlers.add(p, core.QUERY_TIMEOUT)
+
+            self.__client.command("beep", nick)
+            self.__client.ping()
+
+        self.__queries.request(("beep", nick.lower()), start, callback)
+
     def __join_received__(self, params):
-        if len(params) != 1:
+        if len(params) > 1:
             self.__writeln__(":%s ERROR :You can only join a single channel.", self.__config.server_hostname)
         elif (len(params[0]) < 2 or params[0][0] != "#") or not validate.is_valid_group(params[0][1:]):
             self.__writeln__(":%s 403 %s %s", self.__config.server_hostname, self.__session.nick, params[0])
@@ -435,51 +639,83 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
             self.__client.command("name", params[0])
 
     def __privmsg_received__(self, params):
-        if len(params) == 2:
-            if self.__message_timer.elapsed() >= core.TIME_BETWEEN_MESSAGES:
-                self.__message_timer.restart()
-
-                if params[0].startswith("#"):
-                    if self.__client.state.group.lower() == params[0][1:].lower():
-                        self.__open_message__(params[1])
-                    else:
-                        self.__writeln__(":%s 442 %s %s :You're not on that channel.", self.__config.server_hostname, self.__session.nick, params[0])
-                else:
-                    self.__private_message__(params[0], params[1])
+        if params[0].startswith("#"):
+            if self.__client.state.group.lower() == params[0][1:].lower():
+                self.__enqueue_message__(params[0], *self.__open_message__(params[1]))
             else:
-                self.__log.debug("Time between messages too short.")
+                self.__writeln__(":%s 442 %s %s :You're not on that channel.", self.__config.server_hostname, self.__session.nick, params[0])
+        elif not validate.is_valid_nick(params[0]):
+            self.__writeln__(":%s 401 %s %s :No such nick.", self.__config.server_hostname, self.__session.nick, params[0])
+        else:
+            self.__enqueue_message__(params[0], *self.__private_message__(params[0], params[1]))
+
+    def __enqueue_message__(self, target, data, packets):
+        if packets and not self.__outbox.put(data, packets):
+            self.__log.debug("Message queue full, session=%s", self.__session_id)
+
+            self.__counters.increment("message_queue_overflows")
+
+            self.__writeln__(":%s 404 %s %s :Message queue full, message not sent.", self.__config.server_hostname, self.__session.nick, target)
 
     def __open_message__(self, message):
-        for part in wrap(message, 200):
-            e = ltd.Encoder("b")
-            
-            e.add_field_str(part, append_null=True)
+        data = bytearray()
 
-            self.__client.send(e.encode())
+        return data, ltd.encode_chunks_into(data, "b", b"", message)
 
     def __private_message__(self, receiver, message):
-        for part in wrap(message, 200):
-            e = ltd.Encoder("h")
-
-            e.add_field_str("m")
-            e.add_field_str("%s %s" % (receiver, part), append_null=True)
+        data = bytearray()
 
-            self.__client.send(e.encode())
+        return data, ltd.encode_chunks_into(data, "h", b"m\x01%s " % receiver.encode("UTF-8", "backslashreplace"), message)
 
     def __topic_received__(self, params):
-        self.__client.command("topic", params[1])
+        if len(params) == 1:
+            topic = self.__client.state.topic
+
+            if topic:
+                self.__topic_changed__(topic)
+            else:
+                self.__writeln__(":%s 331 #%s :Topic not set.", self.__config.server_hostname, self.__client.state.group)
+        else:
+            self.__client.command("topic", params[1])
 
     def __away_received__(self, params):
         if len(params) == 1 and params[0]:
-            self.__client.command("away", params[0][:29] + "..." if len(params[0]) > 32 else params[0])
+            text = params[0][:29] + "..." if len(params[0]) > 32 else params[0]
+
+            self.__client.command("away", text)
+            self.__away_cache.put(self.__client.state.nick.lower(), text)
             self.__writeln__(":%s 306 %s :You have been marked as being away.", self.__config.server_hostname, self.__session.nick)
         else:
             self.__client.command("noaway")
+            self.__away_cache.remove(self.__client.state.nick.lower())
             self.__writeln__(":%s 305 %s :You are no longer marked as being away.", self.__config.server_hostname, self.__session.nick)
 
     def __quit_received__(self, params):
         self.__client.quit()
 
+    def __user_received__(self, params):
+        self.__writeln__(":%s 462 %s :You may not reregister.", self.__config.server_hostname, self.__session.nick)
+
+    def __pong_received__(self, params):
+        pass
+
+    __post_login_commands__ = {"PING": (__ping_received__, 0),
+                               "PONG": (__pong_received__, 0),
+                               "MOTD": (__motd_received__, 0),
+                               "MODE": (__mode_received__, 1),
+                               "WHO": (__who_received__, 0),
+                               "ISON": (__ison_received__, 1),
+                               "WHOIS": (__whois_received__, 1),
+                               "JOIN": (__join_received__, 1),
+                               "NAMES": (__names_received__, 0),
+                               "NICK": (__nick_received__, 0),
+                               "USER": (__user_received__, 0),
+                               "PRIVMSG": (__privmsg_received__, 2),
+                               "NOTICE": (__privmsg_received__, 2),
+                               "TOPIC": (__topic_received__, 1),
+                               "AWAY": (__away_received__, 0),
+                               "QUIT": (__quit_received__, 0)}
+
     """"
         receive & handle ICB messages:
     """
@@ -487,118 +723,108 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         try:
             self.__log.debug("Connecting to %s:%d.", self.__icb_host, self.__icb_port)
 
-            self.__client = client.Client(self.__icb_host, self.__icb_port)
+            self.__client = client.Client(self.__icb_host,
+                                          self.__icb_port,
+                                          rate=self.__config.icb_rate,
+                                          burst=self.__config.icb_burst,
+                                          groups=self.__groups)
+
+            self.__outbox = outbox.Outbox(self.__client.send,
+                                          self.__config.server_message_rate,
+                                          self.__config.server_message_burst,
+                                          self.__config.server_message_queue_size,
+                                          self.__config.server_message_queue_bytes)
 
             self.__client.state.add_listener(self)
 
-            connection_lost_f = await self.__client.connect()
+            connection_lost_f = await self.__client.connect(self.__icb_message_received__)
 
-            self.__client.login(loginid, nick, group, "", self.__address)
+            self.__session.send_queue = self.__client.send_queue
 
-            msg_f = asyncio.ensure_future(self.__client.read())
+            self.__client.login(loginid, nick, group, "", self.__address)
 
-            running = True
+            ex = await connection_lost_f
 
-            while running:
-                done, _ = await asyncio.wait([msg_f, connection_lost_f], return_when=asyncio.FIRST_COMPLETED)
+            self.__log.debug("Disconnected from %s:%d.", self.__icb_host, self.__icb_port)
 
-                for task in done:
-                    if task is msg_f:
-                        t, f = task.result()
+            if ex:
+                # raised while processing a message, e.g. by a state listener
+                self.__log.warning("ICB session failed, session=%s: %s",
+                                   self.__session_id,
+                                   "".join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
 
-                        completed = []
+                self.__writeln__("ERROR :%s", ex)
 
-                        for p in self.__handlers:
-                            if not p.feed(t, f):
-                                completed.append(p)
+            self.__close__()
+        except Exception as ex:
+            self.__log.warning(traceback.format_exc())
 
-                        for p in completed:
-                            self.__handlers.remove(p)
+    def __icb_message_received__(self, msg):
+        # called from the protocol's data_received(), don't let exceptions escape into the ICB connection
+        try:
+            self.__quiet = self.__handlers.feed(msg)
+        except:
+            self.__log.warning(traceback.format_exc())
+            self.__close__()
+            return
 
-                        try:
-                            if t == "j":
-                                self.__welcome__()
-                            elif t == "b":
-                                self.__writeln__(":%s PRIVMSG #%s :%s", f[0], self.__client.state.group, f[1])
-                            elif t == "c":
-                                self.__writeln__(":%s PRIVMSG %s :%s", f[0], self.__client.state.nick, f[1])
-                            elif t == "d":
-                                self.__process_status_message__(f[0], f[1])
-                            elif t == "e":
-                                self.__process_error_message__(f[0])
-                            elif t == "e":
-                                self.__process_wall_message__(f[0])
-                            elif t == "i":
-                                self.__process_command_message__(f)
-                        except:
-                            self.__log.warning(traceback.format_exc())
+        fn = self.__icb_handlers__.get(msg.type_id)
 
-                        msg_f = asyncio.ensure_future(self.__client.read())
-                    elif task is connection_lost_f:
-                        running = False
+        if fn:
+            try:
+                fn(self, msg)
+            except:
+                self.__log.warning(traceback.format_exc())
 
-            msg_f.cancel()
+    def __protocol_message__(self, msg):
+        self.__welcome__()
 
-            self.__log.debug("Disconnected from %s:%d.", self.__icb_host, self.__icb_port)
+    def __open_message_received__(self, msg):
+        self.__writeln__(":%s PRIVMSG #%s :%s", msg.sender, self.__client.state.group, msg.text)
 
-            self.__transport.close()
-        except Exception as ex:
-            self.__log.warning(traceback.format_exc())
+    def __personal_message_received__(self, msg):
+        self.__writeln__(":%s PRIVMSG %s :%s", msg.sender, self.__client.state.nick, msg.text)
 
     def __welcome__(self):
-        self.__writeln__(":%s 001 %s :Welcome to the Internet Relay Network %s.", self.__config.server_hostname, self.__session.nick, self.__session.nick)
-        self.__writeln__(":%s 002 %s :Your host is %s, running version v%s.", self.__config.server_hostname, self.__session.nick, self.__config.server_hostname, core.VERSION)
-        self.__writeln__(":%s 004 %s :%s v%s oi npstiqC", self.__config.server_hostname, self.__session.nick, core.NAME, core.VERSION)
+        self.__roster.add_provider(self.__refresh_roster__)
+
+        self.__write__(self.__welcome.render(self.__session.nick))
 
         self.__send_motd__()
 
         self.__writeln__(":%s 221 %s +i", self.__config.server_hostname, self.__session.nick)
 
     def __send_motd__(self):
-        self.__writeln__(":%s 375 %s :- %s Message of the Day", self.__config.server_hostname, self.__session.nick, self.__config.server_hostname)
-
-        try:
-            with open(self.__config.server_motd) as f:
-                for l in f:
-                    self.__writeln__(":%s 372 %s :- %s", self.__config.server_hostname, self.__session.nick, l)
-        except:
-            pass
-
-        self.__writeln__(":%s 376 %s :End of MOTD", self.__config.server_hostname, self.__session.nick)
+        self.__write__(self.__motd.render(self.__session.nick))
 
-    def __process_status_message__(self, category, text):
-        self.__writeln__("NOTICE %s :***%s*** %s", self.__session.nick, category, text)
-        
-        if category == "Register" and text.startswith("Nick already in use"):
-            self.__die__(436, "%s :Nickname collision" % self.__session.nick)
-        elif category == "FYI":
-            self.__fyi_message__(text)
-        elif category == "RSVP":
-            self.__rsvp_message__(text)
+    def __process_status_message__(self, msg):
+        self.__writeln__("NOTICE %s :***%s*** %s", self.__session.nick, msg.category, msg.text)
 
-    def __fyi_message__(self, text):
-        m = re.match(r"You are invited to group (\w+)", text)
+        fn = self.__status_event_handlers__.get(type(msg.event))
 
-        if m:
-            self.__writeln__(":%s INVITE %s #%s", self.__config.server_hostname, self.__session.nick, m.group(1))
+        if fn:
+            fn(self, msg.event)
 
-    def __rsvp_message__(self, text):
-        m = re.match(r"You can now talk in group (\w+)", text)
+    def __nick_in_use__(self, event):
+        self.__die__(436, "%s :Nickname collision" % self.__session.nick)
 
-        invitation = None
+    def __invited__(self, event):
+        self.__writeln__(":%s INVITE %s #%s", self.__config.server_hostname, self.__session.nick, event.group)
 
-        if m:
-            invitation = m.group(1)
-        else:
-            m = re.match(r"You are invited to group (\w+)", text)
+    def __member_arrived_or_left__(self, event):
+        self.__away_cache.remove(event.nick.lower())
 
-            if m:
-                invitation = m.group(1)
+    def __member_renamed__(self, event):
+        self.__away_cache.remove(event.old.lower())
 
-        if invitation:
-            self.__writeln__(":%s INVITE %s #%s", self.__config.server_hostname, self.__session.nick, invitation)
+    __status_event_handlers__ = {client.NickInUse: __nick_in_use__,
+                                 client.Invited: __invited__,
+                                 client.MemberArrived: __member_arrived_or_left__,
+                                 client.MemberLeft: __member_arrived_or_left__,
+                                 client.NickChanged: __member_renamed__}
 
-    def __process_error_message__(self, text):
+    def __process_error_message__(self, msg):
+        text = msg.text
         command, params = "ERROR", ":" + text
 
         try:
@@ -622,13 +848,21 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         elif text.startswith("Access denied"):
             return 465, params
 
-    def __process_wall_message__(self, fields):
-        if len(fields) >= 2:
-            self.__writeln__("NOTICE %s :***%s*** %s", self.__session.nick, fields[0], fields[1])
+    def __process_wall_message__(self, msg):
+        if len(msg.fields) >= 2:
+            self.__writeln__("NOTICE %s :***%s*** %s", self.__session.nick, msg.category, msg.text)
+
+    def __process_command_message__(self, msg):
+        if not self.__client.state.joining and not self.__quiet and msg.output_type == "co":
+            self.__writeln__("NOTICE %s :%s", self.__session.nick, msg.text)
 
-    def __process_command_message__(self, fields):
-        if not self.__client.state.joining and fields[0] == "co":
-            self.__writeln__("NOTICE %s :%s", self.__session.nick, fields[1])
+    __icb_handlers__ = {ltd.ProtocolMessage.type_id: __protocol_message__,
+                        ltd.OpenMessage.type_id: __open_message_received__,
+                        ltd.PersonalMessage.type_id: __personal_message_received__,
+                        ltd.StatusMessage.type_id: __process_status_message__,
+                        ltd.ErrorMessage.type_id: __process_error_message__,
+                        ltd.ImportantMessage.type_id: __process_wall_message__,
+                        ltd.CommandOutput.type_id: __process_command_message__}
 
     """"
         client events:
@@ -655,32 +889,43 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
     def __after_join__(self):
         self.__writeln__(":%s JOIN #%s", self.__session.clientid, self.__client.state.group)
 
-        topic = self.__client.state.topic
+        topic = self.__group_state__().topic
         channel = self.__client.state.group
-        status = self.__client.state.group_status
-        
+
         if topic:
             self.__writeln__(":%s 332 %s #%s :%s", self.__config.server_hostname, self.__session.nick, channel, topic)
         else:
             self.__writeln__(":%s 331 #%s :Topic not set.", self.__config.server_hostname, channel)
 
-        for nick in self.__client.state.members:
-            visiblity = "="
+        self.__send_names__()
+
+    def __send_names__(self):
+        group = self.__group_state__()
+        channel = self.__client.state.group
+        status = group.group_status or ""
+        moderator = group.moderator
+
+        visiblity = "="
 
-            if "i" in status:
-                visiblity = "@"
-            elif "s" in status:
-                visiblity = "*"
+        if "i" in status:
+            visiblity = "@"
+        elif "s" in status:
+            visiblity = "*"
 
-            user_flag = ""
+        if moderator:
+            moderator = group.members.nick(moderator)
 
-            if self.__client.state.moderator and nick.lower() == self.__client.state.moderator.lower():
-                user_flag = "@"
+        nicks = ("@" + nick if nick == moderator else nick for nick in group.members)
+        prefix = ":%s 353 %s %s #%s :" % (self.__config.server_hostname, self.__client.state.nick, visiblity, channel)
 
-            self.__writeln__(":%s 353 %s %s #%s :%s%s", self.__config.server_hostname, self.__client.state.nick, visiblity, channel, user_flag, nick)
+        for line in irc.pack_list(prefix, nicks):
+            self.__writeln__("%s", line)
 
         self.__writeln__(":%s 366 %s #%s :End of NAMES list", self.__config.server_hostname, self.__client.state.nick, channel)
 
+    def __group_state__(self):
+        return self.__client.group or self.__client.state
+
     def __topic_changed__(self, topic):
         self.__writeln__(":%s 332 %s #%s :%s", self.__config.server_hostname, self.__session.nick, self.__client.state.group, topic)
 
@@ -692,6 +937,11 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         if not self.__client.state.joining and nick != self.__session.nick:
             self.__writeln__(":%s!~%s JOIN :#%s", nick, loginid, self.__client.state.group)
 
+    def members_added(self, members):
+        if not self.__client.state.joining:
+            for nick, loginid in members:
+                self.member_added(nick, loginid)
+
     def member_removed(self, nick, loginid):
         if not self.__client.state.joining and nick != self.__session.nick:
             self.__writeln__(":%s!~%s PART :#%s", nick, loginid, self.__client.state.group)
@@ -706,18 +956,56 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
     def __die__(self, errcode, params):
         self.__writeln__(":%s %03d %s", self.__config.server_hostname, errcode, params)
         self.__shutdown = True
+        self.__flush__()
         self.__transport.write_eof()
 
+    def __close__(self):
+        self.__flush__()
+        self.__transport.close()
+
     def __writeln__(self, fmt, *args):
         if not self.__shutdown:
-            self.__log.debug("[%s] => %s" % (self.__session_id, fmt % args))
+            line = fmt % args
+
+            self.__log.debug("[%s] => %s", self.__session_id, line)
+
+            self.__output.extend(line.encode("utf-8"))
+            self.__output.extend(b"\r\n")
+
+            self.__schedule_flush__()
+
+    def __write__(self, data):
+        # writes pre-encoded lines
+        if not self.__shutdown:
+            self.__log.debug("[%s] => %d bytes", self.__session_id, len(data))
+
+            self.__output.extend(data)
 
-            self.__transport.write((fmt % args).encode("utf-8"))
-            self.__transport.write(bytearray((13, 10)))
+            self.__schedule_flush__()
+
+    def __schedule_flush__(self):
+        if len(self.__output) >= core.OUTPUT_FLUSH_THRESHOLD:
+            self.__flush__()
+        elif not self.__flush_scheduled:
+            self.__flush_scheduled = True
+
+            asyncio.get_running_loop().call_soon(self.__scheduled_flush__)
+
+    def __scheduled_flush__(self):
+        self.__flush_scheduled = False
+
+        if not self.__transport.is_closing():
+            self.__flush__()
+
+    def __flush__(self):
+        if self.__output:
+            data, self.__output = self.__output, bytearray()
+
+            self.__transport.write(data)
 
     @staticmethod
     def __map_group_status__(flags):
-        control, visibility, volume = flags
+        control, visibility, volume = flags or "---"
 
         mapped = "+n"
 
@@ -739,28 +1027,53 @@ class IRCServerProtocol(asyncio.Protocol, client.StateListener):
         return mapped
 
 class Server:
-    def __init__(self, log, config):
+    def __init__(self, log, config, limit, reuse_port=False):
         self.__log = log
         self.__connections = {}
+        self.__counters = metrics.Counters()
+        self.__roster = roster.Roster(config.icb_roster_ttl)
+        self.__timers = timerwheel.TimerWheel(core.TIMER_RESOLUTION)
+        self.__shared = Shared(connections=self.__connections,
+                               counters=self.__counters,
+                               roster=self.__roster,
+                               queries=inflight.Registry(self.__counters, core.QUERY_TIMEOUT, self.__timers),
+                               away_cache=cache.TTLCache(core.AWAY_CACHE_SIZE, core.AWAY_CACHE_TIMEOUT, self.__counters, "away_cache"),
+                               groups=groups.Registry(self.__counters),
+                               limit=limit,
+                               resolver=resolver.Resolver(self.__counters,
+                                                          core.DNS_TIMEOUT,
+                                                          core.DNS_CACHE_SIZE,
+                                                          core.DNS_CACHE_TTL,
+                                                          core.DNS_NEGATIVE_TTL),
+                               welcome=motd.Template([":%s 001 %s :Welcome to the Internet Relay Network %s." % (config.server_hostname, motd.NICK, motd.NICK),
+                                                      ":%s 002 %s :Your host is %s, running version v%s." % (config.server_hostname, motd.NICK, config.server_hostname, core.VERSION),
+                                                      ":%s 004 %s :%s v%s oi npstiqC" % (config.server_hostname, motd.NICK, core.NAME, core.VERSION)]),
+                               motd=motd.MOTD(config.server_hostname, config.server_motd, core.MOTD_CHECK_INTERVAL),
+                               timers=self.__timers)
         self.__servers = []
         self.__config = config
+        self.__reuse_port = reuse_port
 
     async def run(self):
         loop = asyncio.get_running_loop()
 
+        loop.create_task(self.__roster.run())
+
         for addr in self.__config.bindings:
             self.__log.info("Found binding: %s", addr)
 
             binding = url.parse_server_address(addr)
+            preferences = config.for_binding(self.__config, binding.get("options", {}))
 
             if binding["protocol"] == "tcp":
                 self.__log.info("Listening on %s:%d (tcp)", binding["address"], binding["port"])
 
-                server = await loop.create_server(lambda: IRCServerProtocol(self.__config,
-                                                                            self.__log,
-                                                                            self.__connections),
+                server = await loop.create_server(lambda preferences=preferences: IRCServerProtocol(preferences,
+                                                                                                    self.__log,
+                                                                                                    self.__shared),
                                                                             binding["address"],
-                                                                            binding["port"])
+                                                                            binding["port"],
+                                                                            reuse_port=self.__reuse_port)
 
                 self.__servers.append(server)
 
@@ -770,32 +1083,73 @@ class Server:
                 sc = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
                 sc.load_cert_chain(binding["cert"], binding["key"])
 
-                server = await loop.create_server(lambda: IRCServerProtocol(self.__config,
-                                                                            self.__log,
-                                                                            self.__connections),
+                server = await loop.create_server(lambda preferences=preferences: IRCServerProtocol(preferences,
+                                                                                                    self.__log,
+                                                                                                    self.__shared),
                                                                             binding["address"],
                                                                             binding["port"],
-                                                                            ssl=sc)
+                                                                            ssl=sc,
+                                                                            reuse_port=self.__reuse_port)
+
+                self.__servers.append(server)
             else:
                 raise NotImplementedError("Unsupported protocol: %s", binding["protocol"])
 
         await asyncio.gather(*(map(lambda s: s.serve_forever(), self.__servers)))
 
+    def log_counters(self):
+        self.__log.info("Connections: %d", len(self.__connections))
+        self.__log.info("Groups: %d", len(self.__shared.groups))
+        self.__log.info("Timers: %d", len(self.__timers))
+
+        timings = self.__shared.resolver.timings
+
+        self.__log.info("DNS lookups: %d, average=%.3fs, max=%.3fs", len(timings), timings.average, timings.max)
+
+        for k, v in self.__counters.items():
+            self.__log.info("%s: %d", k, v)
+
+        for session_id, session in self.__connections.items():
+            if session.send_queue:
+                self.__log.info("Session %s (%s): queued=%d, sent=%d, average_wait=%.3fs, max_wait=%.3fs",
+                                session_id,
+                                session.nick,
+                                len(session.send_queue),
+                                session.send_queue.sent,
+                                session.send_queue.average_wait,
+                                session.send_queue.max_wait)
+
+    def reload(self):
+        self.__log.info("Reloading MOTD.")
+
+        self.__shared.motd.invalidate()
+
     def close(self):
         self.__log.info("Stopping server.")
 
         for s in self.__servers:
             s.close()
 
-async def run_service(opts):
-    data_dir = opts.get("data_dir")
-
+def load_preferences(opts):
     mapping = config.json.load(opts["config"])
-    preferences = config.from_mapping(mapping)
 
+    return config.from_mapping(mapping)
+
+def start_service(opts, limit=None):
+    preferences = load_preferences(opts)
+    event_loop = eventloop.install(preferences.server_event_loop)
+
+    asyncio.run(run_service(preferences, event_loop, limit))
+
+async def run_service(preferences, event_loop, limit=None):
     logger = log.new_logger("ircd", preferences.logging_verbosity)
 
     logger.info("Starting server process with pid %d.", os.getpid())
+
+    if event_loop != preferences.server_event_loop:
+        logger.warning("Event loop '%s' not available, falling back to '%s'.", preferences.server_event_loop, event_loop)
+
+    logger.info("Event loop: %s", event_loop)
     logger.info("Hostname: %s", preferences.server_hostname)
     logger.info("Max clients: %d", preferences.server_max_clients)
     logger.info("ICB endpoint: %s", preferences.icb_endpoint)
@@ -805,9 +1159,14 @@ async def run_service(opts):
 
         loop.add_signal_handler(signal.SIGINT, lambda: server.close())
         loop.add_signal_handler(signal.SIGTERM, lambda: server.close())
+        loop.add_signal_handler(signal.SIGUSR1, lambda: server.log_counters())
+        loop.add_signal_handler(signal.SIGHUP, lambda: server.reload())
 
     try:
-        server = Server(logger, preferences)
+        if limit:
+            server = Server(logger, preferences, limit, reuse_port=True)
+        else:
+            server = Server(logger, preferences, workers.ConnectionLimit(preferences.server_max_clients))
 
         await server.run()
     except asyncio.CancelledError:
@@ -817,25 +1176,57 @@ async def run_service(opts):
 
     logger.info("Server stopped.")
 
+def run_workers(opts):
+    preferences = load_preferences(opts)
+
+    logger = log.new_logger("supervisor", preferences.logging_verbosity)
+
+    logger.info("Starting supervisor process with pid %d, workers: %d.", os.getpid(), opts["workers"])
+
+    limit = workers.SharedConnectionLimit(preferences.server_max_clients, opts["workers"])
+
+    def run_worker(index):
+        limit.bind(index)
+
+        start_service(opts, limit)
+
+    workers.Supervisor(logger, opts["workers"], run_worker, limit.reset).run()
+
+    logger.info("Supervisor stopped.")
+
 def get_opts(argv):
-    options, _ = getopt.getopt(argv, 'c:', ['config='])
+    options, _ = getopt.getopt(argv, 'c:w:', ['config=', 'workers='])
 
-    m = {}
+    m = {"workers": 1}
 
     for opt, arg in options:
         if opt in ('-c', '--config'):
             m["config"] = arg
+        elif opt in ('-w', '--workers'):
+            try:
+                m["workers"] = int(arg)
+            except ValueError:
+                raise getopt.GetoptError("--workers must be a number")
 
     if not m.get("config"):
         raise getopt.GetoptError("--config option is mandatory")
 
+    if m["workers"] < 1:
+        raise getopt.GetoptError("--workers must be at least 1")
+
+    if m["workers"] > 1 and os.name != "posix":
+        raise getopt.GetoptError("--workers is only supported on POSIX systems")
+
     return m
 
 if __name__ == "__main__":
     try:
         opts = get_opts(sys.argv[1:])
 
-        asyncio.run(run_service(opts))
+        if opts["workers"] > 1:
+            run_workers(opts)
+        else:
+            start_service(opts)
 
     except getopt.GetoptError as ex:
         print(str(ex))
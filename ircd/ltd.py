@@ -24,33 +24,43 @@
     OTHER DEALINGS IN THE SOFTWARE.
 """
 class Encoder:
-    def __init__(self, T):
+    def __init__(self, T, buffer=None):
+        # the packet is appended to buffer, so several packets can be written into one caller-supplied buffer
         self.__T = T
-        self.__d = bytearray()
+        self.__d = bytearray() if buffer is None else buffer
+        self.__start = len(self.__d)
+        self.__separator = b""
+        self.__d.extend(b"\0\0")
 
     def add_field(self, data):
-        if self.__d:
-            self.__d.append(1)
+        d = self.__d
 
-        self.__d.extend(data)
+        d += self.__separator
+        d += data
+
+        self.__separator = b"\x01"
 
     def add_field_str(self, text, append_null=False):
-        self.add_field(text.encode("UTF-8", "backslashreplace"))
+        d = self.__d
+
+        d += self.__separator
+        d += text.encode("UTF-8", "backslashreplace")
 
         if append_null:
-            self.__d.append(0)
+            d.append(0)
+
+        self.__separator = b"\x01"
 
     def encode(self):
-        pkg = bytearray()
+        size = len(self.__d) - self.__start - 2
 
-        if len(self.__d) >= 255:
+        if size >= 255:
             raise OverflowError
 
-        pkg.append(len(self.__d) + 1)
-        pkg.append(ord(self.__T))
-        pkg.extend(self.__d)
+        self.__d[self.__start] = size + 1
+        self.__d[self.__start + 1] = ord(self.__T)
 
-        return pkg
+        return self.__d
 
 def encode_str(T, text):
     e = Encoder(T)
@@ -62,9 +72,74 @@ def encode_str(T, text):
 def encode_empty_cmd(T):
     return encode_str(T, "")
 
+def encode_cmd(command, arg=""):
+    e = Encoder("h")
+
+    e.add_field_str(command, append_null=False)
+    e.add_field_str(arg, append_null=True)
+
+    return e.encode()
+
+PING = bytes(encode_empty_cmd("l"))
+PONG = bytes(encode_empty_cmd("m"))
+CONSTANT_COMMANDS = {"w": bytes(encode_cmd("w"))}
+
+MAX_PAYLOAD_SIZE = 254
+MAX_TEXT_SIZE = 200
+
+def encode_chunks_into(buffer, T, prefix, text, max_text_size=MAX_TEXT_SIZE):
+    # splits text into packets of type T & appends them to buffer, returns the number of packets:
+    # each payload consists of prefix, a chunk of text & a trailing null byte
+    data = memoryview(text.encode("UTF-8", "backslashreplace"))
+    budget = min(max_text_size, MAX_PAYLOAD_SIZE - len(prefix) - 1)
+
+    if budget <= 0:
+        raise OverflowError
+
+    offset = 0
+    length = len(data)
+    count = 0
+
+    while offset < length:
+        end = offset + budget
+        skip = 0
+
+        if end >= length:
+            end = length
+        else:
+            space = data.obj.rfind(b" ", offset, end + 1)
+
+            if space > offset:
+                end = space
+                skip = 1
+            else:
+                # don't split multi-byte sequences
+                while data[end] & 0xc0 == 0x80:
+                    end -= 1
+
+                if end == offset:
+                    # budget too small for a single character
+                    raise OverflowError
+
+        buffer.append(len(prefix) + end - offset + 2)
+        buffer.append(ord(T))
+        buffer.extend(prefix)
+        buffer.extend(data[offset:end])
+        buffer.append(0)
+
+        count += 1
+        offset = end + skip
+
+    data.release()
+
+    return count
+
+COMPACT_THRESHOLD = 4096
+
 class Decoder:
     def __init__(self):
         self.__buffer = bytearray()
+        self.__offset = 0
         self.__listeners = []
 
     def add_listener(self, listener):
@@ -74,32 +149,233 @@ class Decoder:
         self.__listeners.remove(listener)
 
     def write(self, data):
-        self.__buffer.extend(data)
-        self.__process__()
+        if self.__offset == len(self.__buffer):
+            # nothing pending: split the chunk in place & keep only the incomplete tail
+            self.__buffer.clear()
 
-    def __process__(self):
-        length = len(self.__buffer)
+            offset = self.__process__(data, 0)
 
-        if length >= 2 and length - 1 >= self.__buffer[0]:
-            p_length = self.__buffer[0]
+            if offset < len(data):
+                with memoryview(data) as view:
+                    self.__buffer.extend(view[offset:])
 
-            for f in self.__listeners:
-                f(chr(self.__buffer[1]), self.__buffer[2:p_length + 1])
+            self.__offset = 0
+        else:
+            self.__buffer.extend(data)
+            self.__offset = self.__process__(self.__buffer, self.__offset)
+
+            if self.__offset == len(self.__buffer):
+                self.__buffer.clear()
+                self.__offset = 0
+            elif self.__offset >= COMPACT_THRESHOLD:
+                del self.__buffer[:self.__offset]
+                self.__offset = 0
+
+    def __process__(self, data, offset):
+        # payloads are memoryview slices into data, they're released after the listeners returned
+        listeners = self.__listeners
+
+        with memoryview(data) as view:
+            length = len(view)
+
+            while length - offset >= 2:
+                end = offset + view[offset] + 1
+
+                if end > length:
+                    break
 
-            self.__buffer = self.__buffer[p_length + 1:]
-            self.__process__()
+                type_id = chr(view[offset + 1])
+                payload = view[offset + 2:end]
+
+                for f in listeners:
+                    f(type_id, payload)
+
+                payload.release()
+
+                offset = end
+
+        return offset
 
 def split(payload):
-    fields = []
-    field = []
+    return bytes(payload).split(b"\x01")
 
-    for b in payload:
-        if b == 1:
-            fields.append(bytearray(field))
-            field = []
-        else:
-            field.append(b)
+class Fields:
+    __slots__ = ("__raw", "__decoded")
+
+    def __init__(self, payload):
+        self.__raw = split(payload)
+        self.__decoded = [None] * len(self.__raw)
+
+    def __len__(self):
+        return len(self.__raw)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.__raw)))]
+
+        text = self.__decoded[index]
+
+        if text is None:
+            text = self.__raw[index].decode("UTF-8").strip("\0")
+            self.__decoded[index] = text
+
+        return text
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.__raw)))
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def raw(self, index):
+        return self.__raw[index]
+
+class Message:
+    __slots__ = ("fields",)
+
+    type_id = None
+
+    def __init__(self, fields):
+        self.fields = fields
+
+class LoginOk(Message):
+    __slots__ = ()
+
+    type_id = "a"
+
+class OpenMessage(Message):
+    __slots__ = ()
+
+    type_id = "b"
+
+    @property
+    def sender(self):
+        return self.fields[0]
+
+    @property
+    def text(self):
+        return self.fields[1]
+
+class PersonalMessage(Message):
+    __slots__ = ()
+
+    type_id = "c"
+
+    @property
+    def sender(self):
+        return self.fields[0]
+
+    @property
+    def text(self):
+        return self.fields[1]
+
+class StatusMessage(Message):
+    __slots__ = ("event",)
+
+    type_id = "d"
+
+    def __init__(self, fields):
+        super().__init__(fields)
+
+        self.event = None
+
+    @property
+    def category(self):
+        return self.fields[0]
+
+    @property
+    def text(self):
+        return self.fields[1]
+
+class ErrorMessage(Message):
+    __slots__ = ()
+
+    type_id = "e"
+
+    @property
+    def text(self):
+        return self.fields[0]
+
+class ImportantMessage(Message):
+    __slots__ = ()
+
+    type_id = "f"
+
+    @property
+    def category(self):
+        return self.fields[0]
+
+    @property
+    def text(self):
+        return self.fields[1]
+
+class ExitMessage(Message):
+    __slots__ = ()
+
+    type_id = "g"
+
+class CommandOutput(Message):
+    __slots__ = ()
+
+    type_id = "i"
+
+    @property
+    def output_type(self):
+        return self.fields[0]
+
+    @property
+    def text(self):
+        return self.fields[1]
+
+class ProtocolMessage(Message):
+    __slots__ = ()
+
+    type_id = "j"
+
+class BeepMessage(Message):
+    __slots__ = ()
+
+    type_id = "k"
+
+    @property
+    def sender(self):
+        return self.fields[0]
+
+class PingMessage(Message):
+    __slots__ = ()
+
+    type_id = "l"
+
+class PongMessage(Message):
+    __slots__ = ()
+
+    type_id = "m"
+
+class UnknownMessage(Message):
+    __slots__ = ("type_id",)
+
+    def __init__(self, type_id, fields):
+        super().__init__(fields)
+
+        self.type_id = type_id
+
+MESSAGE_TYPES = {cls.type_id: cls for cls in (LoginOk,
+                                              OpenMessage,
+                                              PersonalMessage,
+                                              StatusMessage,
+                                              ErrorMessage,
+                                              ImportantMessage,
+                                              ExitMessage,
+                                              CommandOutput,
+                                              ProtocolMessage,
+                                              BeepMessage,
+                                              PingMessage,
+                                              PongMessage)}
+
+def decode_message(type_id, payload):
+    cls = MESSAGE_TYPES.get(type_id)
 
-    fields.append(bytearray(field))
+    if cls is None:
+        return UnknownMessage(type_id, Fields(payload))
 
-    return fields
+    return cls(Fields(payload))
@@ -0,0 +1,62 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+class Counters:
+    def __init__(self):
+        self.__counters = {}
+
+    def increment(self, name, value=1):
+        self.__counters[name] = self.__counters.get(name, 0) + value
+
+    def __getitem__(self, name):
+        return self.__counters.get(name, 0)
+
+    def __len__(self):
+        return len(self.__counters)
+
+    def items(self):
+        return iter(sorted(self.__counters.items()))
+
+class Timings:
+    def __init__(self):
+        self.__count = 0
+        self.__total = 0.0
+        self.__max = 0.0
+
+    def add(self, seconds):
+        self.__count += 1
+        self.__total += seconds
+        self.__max = max(self.__max, seconds)
+
+    def __len__(self):
+        return self.__count
+
+    @property
+    def average(self):
+        return self.__total / self.__count if self.__count else 0.0
+
+    @property
+    def max(self):
+        return self.__max
@@ -0,0 +1,83 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+from timeit import default_timer as timer
+
+NICK = "\0"
+
+class Template:
+    # pre-encoded lines, NICK is replaced by the nickname of the receiver
+    def __init__(self, lines):
+        self.__parts = "".join("%s\r\n" % l for l in lines).encode("utf-8").split(NICK.encode("utf-8"))
+
+    def render(self, nick):
+        return nick.encode("utf-8").join(self.__parts)
+
+class MOTD:
+    def __init__(self, hostname, filename, check_interval):
+        self.__hostname = hostname
+        self.__filename = filename
+        self.__check_interval = check_interval
+        self.__template = None
+        self.__mtime = None
+        self.__next_check = 0.0
+
+    def invalidate(self):
+        self.__template = None
+
+    def render(self, nick):
+        now = timer()
+
+        if self.__template is None or now >= self.__next_check:
+            self.__next_check = now + self.__check_interval
+
+            mtime = self.__stat__()
+
+            if self.__template is None or mtime != self.__mtime:
+                self.__mtime = mtime
+                self.__template = self.__load__()
+
+        return self.__template.render(nick)
+
+    def __stat__(self):
+        try:
+            return os.stat(self.__filename).st_mtime
+        except OSError:
+            return None
+
+    def __load__(self):
+        lines = [":%s 375 %s :- %s Message of the Day" % (self.__hostname, NICK, self.__hostname)]
+
+        try:
+            with open(self.__filename) as f:
+                for l in f:
+                    lines.append(":%s 372 %s :- %s" % (self.__hostname, NICK, l.rstrip("\r\n").replace(NICK, "")))
+        except OSError:
+            pass
+
+        lines.append(":%s 376 %s :End of MOTD" % (self.__hostname, NICK))
+
+        return Template(lines)
@@ -0,0 +1,82 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+from collections import deque
+import scheduler
+
+class Outbox:
+    def __init__(self, send, rate, burst, max_messages, max_bytes):
+        self.__send = send
+        self.__bucket = scheduler.TokenBucket(rate, burst)
+        self.__max_messages = max_messages
+        self.__max_bytes = max_bytes
+        self.__messages = deque()
+        self.__bytes = 0
+        self.__handle = None
+
+    def __len__(self):
+        return len(self.__messages)
+
+    @property
+    def size(self):
+        return self.__bytes
+
+    def put(self, data, packets=1):
+        # queues a message (one or more encoded packets), returns False if the budget is exceeded
+        if len(self.__messages) >= self.__max_messages or self.__bytes + len(data) > self.__max_bytes:
+            return False
+
+        self.__messages.append((data, packets))
+        self.__bytes += len(data)
+
+        if not self.__handle:
+            self.__handle = asyncio.get_running_loop().call_soon(self.__run__)
+
+        return True
+
+    def close(self):
+        if self.__handle:
+            self.__handle.cancel()
+            self.__handle = None
+
+        self.__messages.clear()
+        self.__bytes = 0
+
+    def __run__(self):
+        self.__handle = None
+
+        while self.__messages:
+            delay = self.__bucket.consume()
+
+            if delay > 0.0:
+                self.__handle = asyncio.get_running_loop().call_later(delay, self.__run__)
+                break
+
+            data, packets = self.__messages.popleft()
+
+            self.__bytes -= len(data)
+
+            self.__send(data, packets)
@@ -0,0 +1,81 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+class Pipeline:
+    def __init__(self, timers):
+        self.__timers = timers
+        self.__routes = {}
+        self.__handlers = {}
+
+    def __len__(self):
+        return len(self.__handlers)
+
+    def add(self, handler, timeout):
+        for route in handler.routes:
+            self.__routes.setdefault(route, {})[handler] = None
+
+        self.__handlers[handler] = self.__timers.schedule(timeout, self.__expire__, handler)
+
+    def remove(self, handler):
+        deadline = self.__handlers.pop(handler, None)
+
+        if deadline:
+            self.__timers.cancel(deadline)
+
+            for route in handler.routes:
+                del self.__routes[route][handler]
+
+    def feed(self, msg):
+        # returns True if the message has been seen by a quiet handler
+        quiet = False
+
+        for route in self.__routes_of__(msg):
+            handlers = self.__routes.get(route)
+
+            if handlers:
+                for handler in tuple(handlers):
+                    if handler in handlers:
+                        quiet = quiet or handler.quiet
+
+                        if not handler.feed(msg):
+                            self.remove(handler)
+
+        return quiet
+
+    def clear(self):
+        for handler in tuple(self.__handlers):
+            self.__expire__(handler)
+
+    def __expire__(self, handler):
+        self.remove(handler)
+
+        handler.expire()
+
+    @staticmethod
+    def __routes_of__(msg):
+        if msg.type_id == "i" and msg.fields:
+            return (msg.type_id, "i:" + msg.fields[0])
+
+        return (msg.type_id,)
@@ -0,0 +1,90 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import socket
+from timeit import default_timer as timer
+import cache
+import metrics
+
+class Resolver:
+    def __init__(self, counters, timeout, cache_size, ttl, negative_ttl):
+        self.__counters = counters
+        self.__timeout = timeout
+        self.__negative_ttl = negative_ttl
+        self.__cache = cache.TTLCache(cache_size, ttl, counters, "dns_cache")
+        self.__pending = {}
+        self.__timings = metrics.Timings()
+
+    @property
+    def timings(self):
+        return self.__timings
+
+    async def resolve(self, address):
+        # returns the hostname of address, or address if it cannot be resolved in time
+        host = self.__cache.get(address)
+
+        if host:
+            return host
+
+        f = self.__pending.get(address)
+
+        if f:
+            self.__counters.increment("dns_lookups_coalesced")
+        else:
+            f = asyncio.get_running_loop().run_in_executor(None, self.__lookup__, address)
+            f.add_done_callback(lambda f, start=timer(): self.__completed__(address, start, f))
+
+            self.__pending[address] = f
+
+            self.__counters.increment("dns_lookups")
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(f), self.__timeout)
+        except asyncio.TimeoutError:
+            self.__counters.increment("dns_timeouts")
+
+        return address
+
+    @staticmethod
+    def __lookup__(address):
+        try:
+            return socket.gethostbyaddr(address)[0]
+        except OSError:
+            return None
+
+    def __completed__(self, address, start, f):
+        del self.__pending[address]
+
+        self.__timings.add(timer() - start)
+
+        host = None if f.cancelled() else f.result()
+
+        if host:
+            self.__cache.put(address, host)
+        else:
+            self.__counters.increment("dns_failures")
+
+            self.__cache.put(address, address, self.__negative_ttl)
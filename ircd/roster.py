@@ -0,0 +1,86 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import timer
+
+class User:
+    __slots__ = ("is_mod", "nick", "idle", "loginid", "host", "status", "group")
+
+    def __init__(self, is_mod, nick, idle, loginid, host, status, group):
+        self.is_mod = is_mod
+        self.nick = nick
+        self.idle = idle
+        self.loginid = loginid
+        self.host = host
+        self.status = status
+        self.group = group
+
+class Roster:
+    def __init__(self, ttl):
+        self.__ttl = ttl
+        self.__users = {}
+        self.__age = None
+        self.__providers = []
+
+    @property
+    def expired(self):
+        return self.__age is None or self.__age.elapsed() >= self.__ttl
+
+    @property
+    def age(self):
+        return self.__age.elapsed() if self.__age else 0.0
+
+    def __len__(self):
+        return len(self.__users)
+
+    def lookup(self, nick):
+        return self.__users.get(nick.lower())
+
+    def update(self, users):
+        self.__users = {u.nick.lower(): u for u in users}
+        self.__age = timer.Timer()
+
+    def add_provider(self, provider):
+        self.__providers.append(provider)
+
+    def remove_provider(self, provider):
+        try:
+            self.__providers.remove(provider)
+        except ValueError:
+            pass
+
+    async def run(self):
+        while True:
+            if self.expired and self.__providers:
+                provider = self.__providers.pop(0)
+
+                self.__providers.append(provider)
+
+                provider()
+
+                await asyncio.sleep(self.__ttl)
+            else:
+                await asyncio.sleep(max(self.__ttl - self.age, 1.0))
@@ -0,0 +1,120 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+from collections import deque
+from timeit import default_timer as timer
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.__rate = rate
+        self.__burst = burst
+        self.__tokens = burst
+        self.__updated = timer()
+
+    def consume(self, tokens=1):
+        # takes tokens & returns 0.0, or the seconds until the next token is available:
+        # a batch is let through as soon as one token is available, missing tokens are paid off afterwards
+        now = timer()
+
+        self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated) * self.__rate)
+        self.__updated = now
+
+        if self.__tokens >= 1.0:
+            self.__tokens -= tokens
+
+            return 0.0
+
+        return (1.0 - self.__tokens) / self.__rate
+
+class Scheduler:
+    def __init__(self, write, rate, burst):
+        self.__write = write
+        self.__bucket = TokenBucket(rate, burst)
+        self.__lanes = (deque(), deque())
+        self.__handle = None
+        self.__sent = 0
+        self.__total_wait = 0.0
+        self.__max_wait = 0.0
+
+    def __len__(self):
+        return len(self.__lanes[PRIORITY_HIGH]) + len(self.__lanes[PRIORITY_NORMAL])
+
+    @property
+    def sent(self):
+        return self.__sent
+
+    @property
+    def average_wait(self):
+        return self.__total_wait / self.__sent if self.__sent else 0.0
+
+    @property
+    def max_wait(self):
+        return self.__max_wait
+
+    def send(self, data, priority=PRIORITY_NORMAL, packets=1):
+        if not self.__handle and self.__bucket.consume(packets) == 0.0:
+            # nothing is queued & a token is available: write without queueing
+            self.__sent += 1
+            self.__write(data)
+        else:
+            self.__lanes[priority].append((timer(), data, packets))
+
+            if not self.__handle:
+                self.__handle = asyncio.get_running_loop().call_soon(self.__run__)
+
+    def close(self):
+        if self.__handle:
+            self.__handle.cancel()
+            self.__handle = None
+
+        for lane in self.__lanes:
+            lane.clear()
+
+    def __run__(self):
+        self.__handle = None
+
+        while len(self):
+            lane = self.__lanes[PRIORITY_HIGH] or self.__lanes[PRIORITY_NORMAL]
+            queued, data, packets = lane[0]
+
+            delay = self.__bucket.consume(packets)
+
+            if delay > 0.0:
+                self.__handle = asyncio.get_running_loop().call_later(delay, self.__run__)
+                break
+
+            lane.popleft()
+
+            wait = timer() - queued
+
+            self.__sent += 1
+            self.__total_wait += wait
+            self.__max_wait = max(self.__max_wait, wait)
+
+            self.__write(data)
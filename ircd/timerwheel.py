@@ -0,0 +1,143 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+
+class Deadline:
+    __slots__ = ("when", "tick", "due", "callback", "args")
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.tick = None
+        self.due = False
+        self.callback = callback
+        self.args = args
+
+class TimerWheel:
+    # hashed timer wheel: deadlines are rounded up to the next tick & expired deadlines fire in batches once per tick
+    def __init__(self, resolution=1.0, slots=512):
+        self.__resolution = resolution
+        self.__buckets = [set() for _ in range(slots)]
+        self.__tick = 0
+        self.__now = 0.0
+        self.__count = 0
+        self.__handle = None
+
+    def __len__(self):
+        return self.__count
+
+    @property
+    def now(self):
+        # loop time of the last tick, falls back to the current loop time if the wheel is idle
+        if self.__handle:
+            return self.__now
+
+        return asyncio.get_running_loop().time()
+
+    def schedule(self, delay, callback, *args):
+        deadline = Deadline(self.now + delay, callback, args)
+
+        self.__insert__(deadline)
+
+        return deadline
+
+    def reschedule(self, deadline, delay):
+        # extending an active deadline only updates its time, it's moved to another bucket when its tick is reached
+        when = self.now + delay
+
+        if deadline.tick is not None and self.__tick_of__(when) < deadline.tick:
+            self.cancel(deadline)
+
+        deadline.when = when
+
+        if deadline.tick is None:
+            self.__insert__(deadline)
+
+    def cancel(self, deadline):
+        # a deadline may be cancelled by a callback of the same batch
+        deadline.due = False
+
+        if deadline.tick is not None:
+            self.__buckets[deadline.tick % len(self.__buckets)].discard(deadline)
+
+            deadline.tick = None
+            self.__count -= 1
+
+    def __tick_of__(self, when):
+        return max(int(when / self.__resolution) + 1, self.__tick + 1)
+
+    def __insert__(self, deadline):
+        if not self.__handle:
+            loop = asyncio.get_running_loop()
+
+            self.__now = loop.time()
+            self.__tick = int(self.__now / self.__resolution)
+            self.__handle = loop.call_at((self.__tick + 1) * self.__resolution, self.__run__)
+
+        deadline.tick = self.__tick_of__(deadline.when)
+        deadline.due = False
+
+        self.__buckets[deadline.tick % len(self.__buckets)].add(deadline)
+        self.__count += 1
+
+    def __run__(self):
+        loop = asyncio.get_running_loop()
+
+        self.__now = loop.time()
+
+        expired = []
+
+        while self.__tick < int(self.__now / self.__resolution):
+            self.__tick += 1
+
+            bucket = self.__buckets[self.__tick % len(self.__buckets)]
+
+            for deadline in [d for d in bucket if d.tick == self.__tick]:
+                bucket.remove(deadline)
+
+                deadline.tick = None
+                self.__count -= 1
+
+                if deadline.when > self.__now:
+                    self.__insert__(deadline)
+                else:
+                    deadline.due = True
+                    expired.append(deadline)
+
+        if self.__count:
+            self.__handle = loop.call_at((self.__tick + 1) * self.__resolution, self.__run__)
+        else:
+            self.__handle = None
+
+        for deadline in expired:
+            if not deadline.due:
+                continue
+
+            deadline.due = False
+
+            try:
+                deadline.callback(*deadline.args)
+            except Exception as ex:
+                loop.call_exception_handler({"message": "Timer callback failed.", "exception": ex})
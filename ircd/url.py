@@ -39,8 +39,15 @@ def __parse_netloc__(netloc, port):
 
     return m
 
+def __parse_options__(q, exclude=()):
+    return {k: v[0] for k, v in q.items() if k not in exclude}
+
 def __parse_tcp_url__(url):
-    return __parse_netloc__(url.netloc, 7326)
+    m = __parse_netloc__(url.netloc, 7326)
+
+    m["options"] = __parse_options__(parse_qs(url.query))
+
+    return m
 
 def __parse_tcps_url__(url):
     m = __parse_netloc__(url.netloc, 7327)
@@ -50,6 +57,8 @@ def __parse_tcps_url__(url):
     for k in ("key", "cert"):
         m[k] = q[k][0]
 
+    m["options"] = __parse_options__(q, ("key", "cert"))
+
     return m
 
 def __parse_unix_url__(url):
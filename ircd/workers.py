@@ -0,0 +1,170 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+import signal
+import time
+import traceback
+import multiprocessing
+
+RESTART_DELAY = 1.0
+
+def exit_code(status):
+    # converts a status returned by os.wait(), processes killed by a signal have a negative exit code
+    try:
+        return os.waitstatus_to_exitcode(status)
+    except AttributeError:
+        # Python < 3.9
+        return -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+def signal_name(signum):
+    try:
+        return signal.Signals(signum).name
+    except ValueError:
+        return "signal %d" % signum
+
+class ConnectionLimit:
+    def __init__(self, max_clients):
+        self.__max_clients = max_clients
+        self.__count = 0
+
+    def acquire(self):
+        if self.__count >= self.__max_clients:
+            return False
+
+        self.__count += 1
+
+        return True
+
+    def release(self):
+        self.__count -= 1
+
+class SharedConnectionLimit:
+    # connection counters of all workers in shared memory, must be created before forking
+    def __init__(self, max_clients, workers):
+        self.__max_clients = max_clients
+        self.__counts = multiprocessing.Array("i", workers)
+        self.__index = None
+
+    def bind(self, index):
+        self.__index = index
+
+    def acquire(self):
+        with self.__counts.get_lock():
+            counts = self.__counts.get_obj()
+
+            if sum(counts) >= self.__max_clients:
+                return False
+
+            counts[self.__index] += 1
+
+        return True
+
+    def release(self):
+        with self.__counts.get_lock():
+            self.__counts.get_obj()[self.__index] -= 1
+
+    def reset(self, index):
+        with self.__counts.get_lock():
+            self.__counts.get_obj()[index] = 0
+
+class Supervisor:
+    def __init__(self, log, workers, target, on_exit=None):
+        self.__log = log
+        self.__workers = workers
+        self.__target = target
+        self.__on_exit = on_exit
+        self.__pids = {}
+        self.__stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.__kill__(signal.SIGUSR1))
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.__kill__(signal.SIGHUP))
+
+        for index in range(self.__workers):
+            self.__spawn__(index)
+
+        while self.__pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            index = self.__pids.pop(pid, None)
+
+            if index is not None:
+                if self.__on_exit:
+                    self.__on_exit(index)
+
+                if not self.__stopping:
+                    code = exit_code(status)
+
+                    if code < 0:
+                        self.__log.warning("Worker %d (pid %d) killed by %s, restarting.", index, pid, signal_name(-code))
+                    else:
+                        self.__log.warning("Worker %d (pid %d) exited with status %d, restarting.", index, pid, code)
+
+                    time.sleep(RESTART_DELAY)
+
+                    if not self.__stopping:
+                        self.__spawn__(index)
+
+    def stop(self):
+        if not self.__stopping:
+            self.__log.info("Stopping workers.")
+
+            self.__stopping = True
+            self.__kill__(signal.SIGTERM)
+
+    def __kill__(self, signum):
+        for pid in list(self.__pids):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def __spawn__(self, index):
+        pid = os.fork()
+
+        if pid == 0:
+            code = 0
+
+            try:
+                for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGUSR1, signal.SIGHUP):
+                    signal.signal(signum, signal.SIG_DFL)
+
+                self.__target(index)
+            except:
+                traceback.print_exc()
+
+                code = 1
+            finally:
+                os._exit(code)
+
+        self.__log.info("Started worker %d with pid %d.", index, pid)
+
+        self.__pids[pid] = index
@@ -0,0 +1,74 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ircd"))
+
+import client
+import ltd
+
+def message(T, *fields):
+    e = ltd.Encoder(T)
+
+    for i, f in enumerate(fields):
+        e.add_field_str(f, append_null=i == len(fields) - 1)
+
+    return ltd.decode_message(T, e.encode()[2:])
+
+class AwayParserTest(unittest.TestCase):
+    def test_pending_queries(self):
+        results = {}
+        parsers = []
+
+        for nick in ("alice", "bob"):
+            p = client.AwayParser(nick)
+            p.on_away_found = lambda text, nick=nick: results.setdefault(nick, text)
+
+            parsers.append(p)
+
+        for msg in (message("d", "Away", "bob is away: lunch (since 12:00)"),
+                    message("d", "Away", "Alice is away: gone (since 11:00)")):
+            for p in parsers:
+                p.feed(msg)
+
+        self.assertEqual(results, {"alice": "Alice is away: gone", "bob": "bob is away: lunch"})
+
+    def test_expire(self):
+        results = []
+
+        p = client.AwayParser("alice")
+        p.on_away_found = results.append
+
+        self.assertTrue(p.feed(message("d", "Away", "bob is away: lunch (since 12:00)")))
+
+        p.expire()
+
+        self.assertEqual(results, [None])
+
+if __name__ == "__main__":
+    unittest.main()
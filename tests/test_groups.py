@@ -0,0 +1,164 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ircd"))
+
+import client
+import groups
+import ltd
+import metrics
+import scheduler
+
+class Transport:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data.extend(data)
+
+    def is_closing(self):
+        return False
+
+    def close(self):
+        pass
+
+def new_client(registry):
+    c = client.Client("localhost", 7326, groups=registry)
+    transport = Transport()
+
+    c._Client__transport = transport
+    c._Client__scheduler = scheduler.Scheduler(transport.write, 1000.0, 1000)
+    c._Client__sink = lambda msg: None
+    c.state.nick = "tester"
+
+    return c
+
+def receive(c, T, *fields):
+    e = ltd.Encoder(T)
+
+    for i, f in enumerate(fields):
+        e.add_field_str(f, append_null=i == len(fields) - 1)
+
+    c.__message_received__(ltd.decode_message(T, e.encode()[2:]))
+
+def join(c, group, status, topic):
+    receive(c, "d", "Status", "You are now in group %s" % group)
+    receive(c, "i", "co", "Group: %s  (%s) Mod: tester  Topic: %s" % (group, status, topic))
+    receive(c, "i", "wl", "*", "tester", "0", "0", "1580000000", "me", "example.org", "")
+    receive(c, "i", "co", "Total: 1 users in 1 groups")
+    receive(c, "m")
+
+class GroupStateTest(unittest.TestCase):
+    def test_join_groups_with_same_status(self):
+        async def run():
+            registry = groups.Registry(metrics.Counters())
+            c = new_client(registry)
+
+            join(c, "a", "rvl", "hello")
+            join(c, "b", "rvl", "hello")
+
+            self.assertEqual(c.state.group, "b")
+            self.assertEqual(c.group.group_status, "rvl")
+            self.assertEqual(c.group.topic, "hello")
+            self.assertEqual(c.group.moderator, "tester")
+            self.assertIsNone(registry.lookup("a"))
+
+            c.quit()
+
+            self.assertEqual(len(registry), 0)
+
+        asyncio.run(run())
+
+    def test_join_from_cache(self):
+        async def run():
+            registry = groups.Registry(metrics.Counters())
+            first, second = new_client(registry), new_client(registry)
+
+            join(first, "a", "mvl", "hello")
+
+            receive(second, "d", "Status", "You are now in group a")
+
+            self.assertFalse(second.state.joining)
+            self.assertEqual(second.state.group_status, "mvl")
+            self.assertEqual(second.state.topic, "hello")
+
+        asyncio.run(run())
+
+    def test_join_during_listing(self):
+        async def run():
+            c = new_client(groups.Registry(metrics.Counters()))
+
+            # rows of a background "w" listing arrive while the client is joining
+            receive(c, "d", "Status", "You are now in group a")
+            receive(c, "i", "co", "Group: b  (pvl) Mod: alice  Topic: (None)")
+            receive(c, "i", "wl", "*", "alice", "0", "0", "1580000000", "alice", "example.org", "")
+            receive(c, "i", "co", "Group: a  (rvl) Mod: tester  Topic: hello")
+            receive(c, "i", "wl", "*", "tester", "0", "0", "1580000000", "me", "example.org", "")
+            receive(c, "i", "co", "Total: 2 users in 2 groups")
+            receive(c, "m")
+
+            self.assertEqual(list(c.state.members), ["tester"])
+            self.assertEqual(c.state.group_status, "rvl")
+            self.assertEqual(c.group.moderator, "tester")
+
+        asyncio.run(run())
+
+    def test_pong_of_query_during_join(self):
+        async def run():
+            registry = groups.Registry(metrics.Counters())
+            first, second = new_client(registry), new_client(registry)
+
+            # the pong of a query's ping arrives before the listing of the joined group
+            first.ping()
+
+            receive(first, "d", "Status", "You are now in group a")
+            receive(first, "m")
+
+            self.assertTrue(first.state.joining)
+            self.assertFalse(first.group.complete)
+
+            receive(first, "i", "co", "Group: a  (rvl) Mod: tester  Topic: hello")
+            receive(first, "i", "wl", "*", "tester", "0", "0", "1580000000", "me", "example.org", "")
+            receive(first, "i", "co", "Total: 1 users in 1 groups")
+            receive(first, "m")
+
+            self.assertFalse(first.state.joining)
+            self.assertEqual(list(first.group.members), ["tester"])
+            self.assertEqual(first.group.group_status, "rvl")
+
+            receive(second, "d", "Status", "You are now in group a")
+
+            self.assertEqual(second.state.group_status, "rvl")
+            self.assertIn("tester", list(second.state.members))
+
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ircd"))
+
+import irc
+
+class DecoderTest(unittest.TestCase):
+    def setUp(self):
+        self.lines = []
+
+        self.decoder = irc.Decoder(512, 65536)
+        self.decoder.add_listener(lambda prefix, command, params: self.lines.append((command, params)))
+
+    def test_many_lines_in_one_read(self):
+        self.decoder.write(b"PING x\r\n" * 9000)
+
+        self.assertEqual(len(self.lines), 9000)
+        self.assertEqual(self.lines[0], ("PING", ["x"]))
+
+    def test_partial_line(self):
+        self.decoder.write(b"PING x\r\nPI")
+        self.decoder.write(b"NG y\r\n")
+
+        self.assertEqual(self.lines, [("PING", ["x"]), ("PING", ["y"])])
+
+    def test_line_too_long(self):
+        with self.assertRaises(irc.InputLimitExceeded):
+            self.decoder.write(b"x" * 1024)
+
+    def test_buffer_exceeded(self):
+        decoder = irc.Decoder(max_buffer_size=1024)
+
+        decoder.write(b"PING x\r\n" * 1000)
+
+        with self.assertRaises(irc.InputLimitExceeded):
+            decoder.write(b"x" * 1025)
+
+if __name__ == "__main__":
+    unittest.main()
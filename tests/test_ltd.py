@@ -0,0 +1,65 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ircd"))
+
+import ltd
+
+def chunks(buffer):
+    offset = 0
+
+    while offset < len(buffer):
+        size = buffer[offset]
+
+        yield chr(buffer[offset + 1]), bytes(buffer[offset + 2:offset + size + 1])
+
+        offset += size + 1
+
+class EncodeChunksTest(unittest.TestCase):
+    def test_split_at_spaces(self):
+        buffer = bytearray()
+
+        self.assertEqual(ltd.encode_chunks_into(buffer, "b", b"", "hello world", max_text_size=8), 2)
+        self.assertEqual(list(chunks(buffer)), [("b", b"hello\0"), ("b", b"world\0")])
+
+    def test_keep_multibyte_sequences(self):
+        buffer = bytearray()
+
+        ltd.encode_chunks_into(buffer, "b", b"", "€€€", max_text_size=4)
+
+        self.assertEqual([payload.decode("UTF-8") for _, payload in chunks(buffer)], ["€\0", "€\0", "€\0"])
+
+    def test_budget_too_small(self):
+        buffer = bytearray()
+
+        with self.assertRaises(OverflowError):
+            ltd.encode_chunks_into(buffer, "h", b"m\x01%s " % (b"x" * 248), "€")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import time
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ircd"))
+
+import client
+import ltd
+import pipeline
+import timerwheel
+
+def message(T, *fields):
+    e = ltd.Encoder(T)
+
+    for i, f in enumerate(fields):
+        e.add_field_str(f, append_null=i == len(fields) - 1)
+
+    return ltd.decode_message(T, e.encode()[2:])
+
+class Handler:
+    quiet = False
+
+    def __init__(self, routes, count=1):
+        self.routes = routes
+        self.received = []
+        self.expired = False
+        self.__count = count
+
+    def feed(self, msg):
+        self.received.append(msg)
+
+        return len(self.received) < self.__count
+
+    def expire(self):
+        self.expired = True
+
+class PipelineTest(unittest.TestCase):
+    def test_routes(self):
+        async def run():
+            p = pipeline.Pipeline(timerwheel.TimerWheel())
+            status, output, listing = Handler(("d",)), Handler(("i:co",)), Handler(("i:wl",))
+
+            for h in (status, output, listing):
+                p.add(h, 60.0)
+
+            p.feed(message("b", "nick", "hello"))
+            p.feed(message("i", "co", "Total: 1 users in 1 groups"))
+
+            self.assertEqual(status.received, [])
+            self.assertEqual(len(output.received), 1)
+            self.assertEqual(listing.received, [])
+            self.assertEqual(len(p), 2)
+
+            p.clear()
+
+        asyncio.run(run())
+
+    def test_remove(self):
+        async def run():
+            count = 20000
+            p = pipeline.Pipeline(timerwheel.TimerWheel())
+            handlers = [Handler(("d", "i:co")) for _ in range(count)]
+
+            for h in handlers:
+                p.add(h, 60.0)
+
+            start = time.perf_counter()
+
+            for h in handlers[::2]:
+                p.remove(h)
+
+            # removing from lists would take quadratic time
+            self.assertLess(time.perf_counter() - start, 1.0)
+            self.assertEqual(len(p), count // 2)
+
+            p.feed(message("d", "Status", "Something happened"))
+
+            self.assertTrue(all(h.received for h in handlers[1::2]))
+            self.assertFalse(any(h.received for h in handlers[::2]))
+            self.assertEqual(len(p), 0)
+
+        asyncio.run(run())
+
+    def test_expire(self):
+        async def run():
+            p = pipeline.Pipeline(timerwheel.TimerWheel(0.01))
+            slow, fast = Handler(("d",)), Handler(("d",))
+
+            p.add(slow, 0.02)
+            p.add(fast, 0.02)
+
+            p.feed(message("b", "nick", "hello"))
+            p.remove(fast)
+
+            await asyncio.sleep(0.1)
+
+            self.assertTrue(slow.expired)
+            self.assertFalse(fast.expired)
+            self.assertEqual(len(p), 0)
+
+            p.feed(message("d", "Status", "Something happened"))
+
+            self.assertEqual(slow.received, [])
+
+        asyncio.run(run())
+
+    def test_throughput(self):
+        async def run():
+            handlers, count = 50, 10000
+            p = pipeline.Pipeline(timerwheel.TimerWheel())
+
+            for i in range(handlers):
+                if i % 2:
+                    p.add(client.AwayParser("user%d" % i), 60.0)
+                else:
+                    p.add(client.ListParser(), 60.0)
+
+            samples = (message("b", "nick", "hello world"),
+                       message("c", "nick", "hello world"),
+                       message("d", "Status", "Something happened"),
+                       message("i", "co", "Some command output"))
+
+            start = time.perf_counter()
+
+            for i in range(count):
+                p.feed(samples[i % len(samples)])
+
+            elapsed = time.perf_counter() - start
+
+            self.assertEqual(len(p), handlers)
+            self.assertGreaterEqual(count / elapsed, 10000)
+
+            p.clear()
+
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
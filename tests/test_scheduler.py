@@ -0,0 +1,58 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ircd"))
+
+import scheduler
+
+class SchedulerTest(unittest.TestCase):
+    def test_burst_and_priority(self):
+        async def run():
+            written = []
+            s = scheduler.Scheduler(written.append, 20.0, 2)
+
+            for data in (b"1", b"2", b"3", b"4"):
+                s.send(data)
+
+            s.send(b"ping", scheduler.PRIORITY_HIGH)
+
+            # the burst is written at once, the remaining packets are queued
+            self.assertEqual(written, [b"1", b"2"])
+            self.assertEqual(len(s), 3)
+
+            await asyncio.sleep(0.2)
+
+            self.assertEqual(written, [b"1", b"2", b"ping", b"3", b"4"])
+            self.assertEqual(s.sent, 5)
+
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ircd"))
+
+import timerwheel
+
+class TimerWheelTest(unittest.TestCase):
+    def test_cancel_in_same_batch(self):
+        async def run():
+            wheel = timerwheel.TimerWheel(0.01)
+            fired = []
+            deadlines = []
+
+            def fire(n):
+                fired.append(n)
+
+                wheel.cancel(deadlines[1 - n])
+
+            deadlines.append(wheel.schedule(0.0, fire, 0))
+            deadlines.append(wheel.schedule(0.0, fire, 1))
+
+            await asyncio.sleep(0.05)
+
+            self.assertEqual(len(fired), 1)
+            self.assertEqual(len(wheel), 0)
+
+        asyncio.run(run())
+
+    def test_reschedule_in_same_batch(self):
+        async def run():
+            wheel = timerwheel.TimerWheel(0.01)
+            fired = []
+            deadlines = []
+
+            def fire(n):
+                fired.append(n)
+
+                if len(fired) == 1:
+                    wheel.reschedule(deadlines[1 - n], 0.05)
+
+            deadlines.append(wheel.schedule(0.0, fire, 0))
+            deadlines.append(wheel.schedule(0.0, fire, 1))
+
+            await asyncio.sleep(0.03)
+
+            self.assertEqual(len(fired), 1)
+            self.assertEqual(len(wheel), 1)
+
+            await asyncio.sleep(0.1)
+
+            self.assertEqual(len(fired), 2)
+            self.assertEqual(len(wheel), 0)
+
+        asyncio.run(run())
+
+    def test_cancel(self):
+        async def run():
+            wheel = timerwheel.TimerWheel(0.01)
+            fired = []
+
+            deadline = wheel.schedule(0.02, fired.append, 0)
+            wheel.schedule(0.02, fired.append, 1)
+
+            wheel.cancel(deadline)
+
+            await asyncio.sleep(0.05)
+
+            self.assertEqual(fired, [1])
+
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+    project............: icb-irc
+    description........: ICB-IRC proxy
+    date...............: 01/2020
+    copyright..........: Sebastian Fedrau
+
+    Permission is hereby granted, free of charge, to any person obtaining
+    a copy of this software and associated documentation files (the
+    "Software"), to deal in the Software without restriction, including
+    without limitation the rights to use, copy, modify, merge, publish,
+    distribute, sublicense, and/or sell copies of the Software, and to
+    permit persons to whom the Software is furnished to do so, subject to
+    the following conditions:
+
+    The above copyright notice and this permission notice shall be
+    included in all copies or substantial portions of the Software.
+
+    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+    EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+    MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+    IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+    OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+    ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+    OTHER DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ircd"))
+
+import ircd
+import ltd
+
+def message(T, *fields):
+    e = ltd.Encoder(T)
+
+    for i, f in enumerate(fields):
+        e.add_field_str(f, append_null=i == len(fields) - 1)
+
+    return ltd.decode_message(T, e.encode()[2:])
+
+def feed_group(p, group, *nicks):
+    p.feed(message("i", "co", "Group: %s  (pvl) Mod: (None)  Topic: (None)" % group))
+
+    for nick in nicks:
+        p.feed(message("i", "wl", " ", nick, "0", "0", "1580000000", "me", "example.org", ""))
+
+class UserListParserTest(unittest.TestCase):
+    def setUp(self):
+        self.results = []
+
+        self.parser = ircd.UserListParser()
+        self.parser.on_end = self.results.append
+
+    def test_complete_listing(self):
+        feed_group(self.parser, "1", "alice", "bob")
+        feed_group(self.parser, "2", "carol")
+
+        self.assertFalse(self.parser.feed(message("i", "co", "Total: 3 users in 2 groups")))
+        self.assertEqual(len(self.results), 1)
+        self.assertEqual([(u.nick, u.group) for u in self.results[0]], [("alice", "1"), ("bob", "1"), ("carol", "2")])
+
+    def test_expired_listing_fails(self):
+        feed_group(self.parser, "1", "alice", "bob")
+
+        self.parser.expire()
+
+        self.assertEqual(self.results, [None])
+
+if __name__ == "__main__":
+    unittest.main()